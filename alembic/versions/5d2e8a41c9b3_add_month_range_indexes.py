@@ -0,0 +1,38 @@
+"""Add composite indexes for month range queries
+
+Revision ID: 5d2e8a41c9b3
+Revises: fb7d6dc9bb22
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5d2e8a41c9b3'
+down_revision = 'fb7d6dc9bb22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Статистика посещаемости по группе за месяц:
+    # WHERE group_id = ? AND session_date >= ? AND session_date < ?
+    op.create_index(
+        'ix_attendances_group_id_session_date',
+        'attendances',
+        ['group_id', 'session_date'],
+        unique=False
+    )
+    # Оплаты ученика за месяц (компенсации переносов, неоплатившие)
+    op.create_index(
+        'ix_payments_student_id_payment_month_status',
+        'payments',
+        ['student_id', 'payment_month', 'status'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_student_id_payment_month_status', table_name='payments')
+    op.drop_index('ix_attendances_group_id_session_date', table_name='attendances')
@@ -0,0 +1,23 @@
+"""Add GIN index on students.additional_group_ids
+
+Revision ID: 7a3d51e8b9c2
+Revises: e2b7c3d9f160
+Create Date: 2026-10-17 14:58:12.583904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '7a3d51e8b9c2'
+down_revision = 'e2b7c3d9f160'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_students_additional_group_ids', 'students', ['additional_group_ids'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_students_additional_group_ids', table_name='students')
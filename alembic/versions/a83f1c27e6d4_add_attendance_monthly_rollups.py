@@ -0,0 +1,55 @@
+"""Add attendance monthly rollups
+
+Revision ID: a83f1c27e6d4
+Revises: 5d2e8a41c9b3
+Create Date: 2026-10-17 12:40:08.904517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'a83f1c27e6d4'
+down_revision = '5d2e8a41c9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('attendance_monthly_rollups',
+    sa.Column('group_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('student_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('present_count', sa.Integer(), nullable=False),
+    sa.Column('absent_count', sa.Integer(), nullable=False),
+    sa.Column('transferred_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('group_id', 'student_id', 'year', 'month')
+    )
+    op.create_index(op.f('ix_attendance_monthly_rollups_student_id'), 'attendance_monthly_rollups', ['student_id'], unique=False)
+    op.create_index('ix_attendance_monthly_rollups_year_month', 'attendance_monthly_rollups', ['year', 'month'], unique=False)
+    
+    # Заполняем агрегаты по уже существующей посещаемости
+    op.execute("""
+        INSERT INTO attendance_monthly_rollups
+            (group_id, student_id, year, month, present_count, absent_count, transferred_count)
+        SELECT
+            group_id,
+            student_id,
+            CAST(EXTRACT(year FROM session_date) AS INTEGER),
+            CAST(EXTRACT(month FROM session_date) AS INTEGER),
+            count(*) FILTER (WHERE status = 'PRESENT'),
+            count(*) FILTER (WHERE status = 'ABSENT'),
+            count(*) FILTER (WHERE status = 'TRANSFERRED')
+        FROM attendances
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_monthly_rollups_year_month', table_name='attendance_monthly_rollups')
+    op.drop_index(op.f('ix_attendance_monthly_rollups_student_id'), table_name='attendance_monthly_rollups')
+    op.drop_table('attendance_monthly_rollups')
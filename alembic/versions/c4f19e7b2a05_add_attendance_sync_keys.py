@@ -0,0 +1,33 @@
+"""Add attendance sync keys
+
+Revision ID: c4f19e7b2a05
+Revises: a83f1c27e6d4
+Create Date: 2026-10-17 13:52:31.417209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'c4f19e7b2a05'
+down_revision = 'a83f1c27e6d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('attendance_sync_keys',
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+    sa.Column('group_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('session_date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'idempotency_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('attendance_sync_keys')
@@ -0,0 +1,25 @@
+"""Add refresh token purge indexes
+
+Revision ID: d3f8a6b1c570
+Revises: b91e4c07d2a8
+Create Date: 2026-10-17 19:12:08.415327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd3f8a6b1c570'
+down_revision = 'b91e4c07d2a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_refresh_tokens_revoked_at'), 'refresh_tokens', ['revoked_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_refresh_tokens_revoked_at'), table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
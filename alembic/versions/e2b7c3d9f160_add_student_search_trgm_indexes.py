@@ -0,0 +1,28 @@
+"""Add trigram indexes for student search
+
+Revision ID: e2b7c3d9f160
+Revises: c4f19e7b2a05
+Create Date: 2026-10-17 14:21:47.062318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e2b7c3d9f160'
+down_revision = 'c4f19e7b2a05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_students_full_name_trgm', 'students', ['full_name'], unique=False, postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'})
+    op.create_index('ix_students_phone_trgm', 'students', ['phone'], unique=False, postgresql_using='gin', postgresql_ops={'phone': 'gin_trgm_ops'})
+    op.create_index('ix_students_email_trgm', 'students', ['email'], unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_students_email_trgm', table_name='students')
+    op.drop_index('ix_students_phone_trgm', table_name='students')
+    op.drop_index('ix_students_full_name_trgm', table_name='students')
@@ -0,0 +1,23 @@
+"""Add attendance sync keys created_at index
+
+Revision ID: f5a2c8d9e714
+Revises: d3f8a6b1c570
+Create Date: 2026-10-17 19:48:31.902614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'f5a2c8d9e714'
+down_revision = 'd3f8a6b1c570'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_attendance_sync_keys_created_at'), 'attendance_sync_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_attendance_sync_keys_created_at'), table_name='attendance_sync_keys')
@@ -1,355 +1,488 @@
 """Attendance API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, or_, any_, case
+from sqlalchemy import select, and_, func, delete, update, tuple_, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Dict, Optional
 from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import uuid
 from decimal import Decimal
 
 from app.database import get_db
-from app.models.user import User
 from app.models.attendance import Attendance, AttendanceStatus
+from app.models.attendance_rollup import AttendanceMonthlyRollup
+from app.models.attendance_sync import AttendanceSyncKey
 from app.models.student import Student
-from app.models.subscription import Subscription, SubscriptionType
+from app.models.subscription import Subscription
 from app.models.group import Group
 from app.models.payment import Payment, PaymentType, PaymentStatus
-from app.models.settings import Settings
-from app.constants import (
-    SETTING_KEY_SUBSCRIPTION_8_SENIOR,
-    SETTING_KEY_SUBSCRIPTION_8_JUNIOR,
-    SETTING_KEY_SUBSCRIPTION_12_SENIOR,
-    SETTING_KEY_SUBSCRIPTION_12_JUNIOR,
-    DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE
-)
+from app.constants import MAX_PAGE_SIZE
 from app.schemas.attendance import (
     AttendanceCreate,
     AttendanceMarkRequest,
     AttendanceUpdate,
     AttendanceResponse,
-    AttendanceWithDetails
+    AttendanceWithDetails,
+    AttendanceSyncRequest,
+    AttendanceSyncResult
 )
 from app.core.security import get_current_user
-from app.core.permissions import check_group_access
+from app.core.user_cache import UserSnapshot
+from app.core.permissions import (
+    check_group_access,
+    check_student_access,
+    get_group_resource,
+    group_scope_filter,
+    scope_to_trainer,
+    student_scope_filter,
+)
+from app.core.roster import group_members_filter, groups_members_filter, group_roster_query
+from app.core.attendance_rollup import RollupDeltas, apply_rollup_deltas
+from app.core.pricing import get_subscription_prices, get_price_key, get_sessions_count
+from app.utils.date_helpers import month_filter
+from app.utils.training_calendar import get_month_session_dates
+from app.utils.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/api/attendance", tags=["attendance"])
 
 
-@router.post("/mark", response_model=List[AttendanceResponse], status_code=status.HTTP_201_CREATED)
-async def mark_attendance(
-    attendance_data: AttendanceMarkRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Mark attendance for multiple students in a session. Updates existing records if found."""
-    # Verify group access
-    await check_group_access(attendance_data.group_id, current_user, db)
+async def _build_transfer_payments(
+    db: AsyncSession,
+    group: Group,
+    session_date: date,
+    subscriptions: Dict[uuid.UUID, Subscription]
+) -> List[Payment]:
+    """Build next-month compensation payments for transferred sessions.
+    
+    Amounts already paid for the session month are loaded for all transferred
+    students at once; standard prices come from the pricing cache.
+    """
+    prices = await get_subscription_prices(db)
+    
+    # Actual payments for the session month, per student
+    paid_result = await db.execute(
+        select(Payment.student_id, func.sum(Payment.amount))
+        .where(
+            Payment.student_id.in_(list(subscriptions)),
+            month_filter(Payment.payment_month, session_date.year, session_date.month)
+        )
+        .group_by(Payment.student_id)
+    )
+    paid_amounts = dict(paid_result.all())
     
-    session_date = attendance_data.session_date
-    result_attendances = []
+    # Calculate next month (first day of next month)
+    next_month = (session_date + relativedelta(months=1)).replace(day=1)
     
-    for attendance_item in attendance_data.attendances:
+    payments = []
+    for student_id, subscription in subscriptions.items():
+        sessions_count = get_sessions_count(subscription.subscription_type)
+        standard_price = prices[get_price_key(subscription.subscription_type, group.age_group)]
+        
+        # Use actual paid amount if exists, otherwise use standard price
+        actual_paid_amount = paid_amounts.get(student_id)
+        base_price = Decimal(str(actual_paid_amount)) if actual_paid_amount else Decimal(str(standard_price))
+        session_cost = base_price / Decimal(str(sessions_count))
+        
+        payments.append(Payment(
+            student_id=student_id,
+            subscription_id=subscription.id,
+            amount=session_cost,
+            payment_date=next_month,
+            payment_month=next_month,
+            payment_type=PaymentType.PARTIAL,
+            status=PaymentStatus.PENDING,
+            notes=f"Автоматическая компенсация за перенос от {session_date.strftime('%d.%m.%Y')}"
+        ))
+    
+    return payments
+
+
+async def _use_subscription_sessions(db: AsyncSession, subscription_ids: List[uuid.UUID]) -> None:
+    """Write off one session from each subscription in a single UPDATE.
+    
+    The decrement happens in the database, so concurrent marks cannot lose
+    updates. A subscription is deactivated when its last session is used.
+    """
+    await db.execute(
+        update(Subscription)
+        .where(
+            Subscription.id.in_(subscription_ids),
+            Subscription.remaining_sessions > 0
+        )
+        .values(
+            remaining_sessions=Subscription.remaining_sessions - 1,
+            # SET видит старое значение: 1 -> 0 означает последнее занятие
+            is_active=Subscription.remaining_sessions > 1
+        )
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+async def _apply_marks(
+    db: AsyncSession,
+    group: Group,
+    session_date: date,
+    attendances: List[dict],
+    current_user: UserSnapshot
+) -> List[Attendance]:
+    """Apply attendance marks of one session without committing.
+    
+    The whole payload is processed as a set: students, existing records and
+    active subscriptions are loaded with one query each, and all records are
+    written with a single upsert, so the number of queries does not depend on
+    the size of the group.
+    """
+    group_id = group.id
+    
+    # Parse payload: student_id -> (status, notes). The last entry for a student wins.
+    marks = {}
+    for attendance_item in attendances:
         try:
             student_id_str = str(attendance_item["student_id"])
             student_id = uuid.UUID(student_id_str)
         except (ValueError, KeyError) as e:
             print(f"ERROR parsing student_id: {attendance_item.get('student_id')}, error: {e}")
             continue
-            
+        
         status_value = attendance_item.get("status")  # Может быть None
-        notes = attendance_item.get("notes")
         
-        # Verify student belongs to group (primary or additional)
-        result = await db.execute(
-            select(Student).where(Student.id == student_id)
+        # Конвертируем в AttendanceStatus
+        if status_value is not None:
+            try:
+                status_value = AttendanceStatus(status_value)
+            except ValueError as e:
+                print(f"ERROR: Invalid status value '{status_value}' for student {student_id}: {e}")
+                continue
+        
+        marks[student_id] = (status_value, attendance_item.get("notes"))
+    
+    if not marks:
+        return []
+    
+    # Keep only students that belong to this group (primary or additional)
+    students_result = await db.execute(
+        select(Student.id).where(
+            Student.id.in_(list(marks)),
+            group_members_filter(group_id)
+        )
+    )
+    member_ids = set(students_result.scalars().all())
+    marks = {student_id: mark for student_id, mark in marks.items() if student_id in member_ids}
+    
+    if not marks:
+        return []
+    
+    # Отметки одной группы за один день применяются по очереди: иначе два
+    # параллельных запроса видят одно и то же старое состояние и счетчики
+    # в rollup расходятся с таблицей attendances
+    await db.execute(
+        select(func.pg_advisory_xact_lock(
+            func.hashtext(f"attendance:{group_id}:{session_date.isoformat()}")
+        ))
+    )
+    
+    # Existing attendance for these students on this date, locked until commit
+    # (PUT/DELETE /attendance/{id} lock the same rows)
+    existing_result = await db.execute(
+        select(Attendance.student_id, Attendance.id, Attendance.status)
+        .where(
+            Attendance.group_id == group_id,
+            Attendance.session_date == session_date,
+            Attendance.student_id.in_(list(marks))
+        )
+        .with_for_update()
+    )
+    existing = {student_id: (attendance_id, old_status) for student_id, attendance_id, old_status in existing_result.all()}
+    
+    # Active subscription for each student (most recent)
+    subscriptions_result = await db.execute(
+        select(Subscription)
+        .where(
+            Subscription.student_id.in_(list(marks)),
+            Subscription.is_active == True
         )
-        student = result.scalar_one_or_none()
+        .distinct(Subscription.student_id)
+        .order_by(Subscription.student_id, Subscription.created_at.desc())
+    )
+    subscriptions = {subscription.student_id: subscription for subscription in subscriptions_result.scalars()}
+    
+    rollup_deltas = RollupDeltas()
+    removed_ids = []
+    rows = []
+    transferred = {}
+    for student_id, (status_value, notes) in marks.items():
+        old_status = existing[student_id][1] if student_id in existing else None
+        rollup_deltas.track(group_id, student_id, session_date, old_status, status_value)
         
-        if not student:
+        # Если status = None, удаляем существующую запись
+        if status_value is None:
+            if student_id in existing:
+                removed_ids.append(existing[student_id][0])
             continue
         
-        # Check if student belongs to this group (primary or additional)
-        belongs_to_group = (
-            student.group_id == attendance_data.group_id or
-            (student.additional_group_ids and attendance_data.group_id in student.additional_group_ids)
-        )
+        subscription = subscriptions.get(student_id)
         
-        if not belongs_to_group:
-            continue
+        # Create partial payment for next month if (newly) transferred
+        if subscription and status_value == AttendanceStatus.TRANSFERRED and old_status != AttendanceStatus.TRANSFERRED:
+            transferred[student_id] = subscription
         
-        # Check if attendance already exists for this student/group/date
-        existing_result = await db.execute(
-            select(Attendance).where(
-                Attendance.student_id == student_id,
-                Attendance.group_id == attendance_data.group_id,
-                Attendance.session_date == session_date
-            )
+        rows.append({
+            'id': uuid.uuid4(),
+            'student_id': student_id,
+            'group_id': group_id,
+            'session_date': session_date,
+            'status': status_value,
+            'subscription_id': subscription.id if subscription else None,
+            'marked_by': current_user.id,
+            'notes': notes,
+            'created_at': datetime.utcnow(),
+        })
+    
+    if removed_ids:
+        await db.execute(delete(Attendance).where(Attendance.id.in_(removed_ids)))
+    
+    result_attendances = []
+    if rows:
+        # Insert new records and update existing ones in one statement.
+        # subscription_id and created_at of existing records are kept.
+        upsert = pg_insert(Attendance).values(rows)
+        upsert = upsert.on_conflict_do_update(
+            constraint='uq_attendance_student_group_date',
+            set_={
+                'status': upsert.excluded.status,
+                'notes': upsert.excluded.notes,
+                'marked_by': upsert.excluded.marked_by,
+            }
+        )
+        # xmax = 0 only for rows inserted by this statement (not updated on conflict)
+        upsert_result = await db.execute(
+            upsert.returning(Attendance, literal_column("xmax = 0").label("inserted")),
+            execution_options={"populate_existing": True}
         )
-        existing_attendance = existing_result.scalar_one_or_none()
+        marked = {}
+        used_subscription_ids = []
+        for attendance, inserted in upsert_result.all():
+            marked[attendance.student_id] = attendance
+            # Занятие списывается только для новых записей "присутствовал"
+            if inserted and attendance.status == AttendanceStatus.PRESENT and attendance.subscription_id:
+                used_subscription_ids.append(attendance.subscription_id)
         
-        # Если status = None, удаляем существующую запись
-        if status_value is None:
-            if existing_attendance:
-                await db.delete(existing_attendance)
-            continue
+        if used_subscription_ids:
+            await _use_subscription_sessions(db, used_subscription_ids)
         
-        # Конвертируем в AttendanceStatus
-        try:
-            status_value = AttendanceStatus(status_value)
-        except ValueError as e:
-            print(f"ERROR: Invalid status value '{status_value}' for student {student_id}: {e}")
+        # Keep payload order in the response
+        result_attendances = [marked[row['student_id']] for row in rows if row['student_id'] in marked]
+    
+    if transferred:
+        db.add_all(await _build_transfer_payments(db, group, session_date, transferred))
+    
+    await apply_rollup_deltas(db, rollup_deltas)
+    await db.flush()
+    
+    return result_attendances
+
+
+@router.post("/mark", response_model=List[AttendanceResponse], status_code=status.HTTP_201_CREATED)
+async def mark_attendance(
+    attendance_data: AttendanceMarkRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Mark attendance for multiple students in a session. Updates existing records if found."""
+    # Verify group access
+    group = await check_group_access(attendance_data.group_id, current_user, db)
+    
+    result_attendances = await _apply_marks(
+        db, group, attendance_data.session_date, attendance_data.attendances, current_user
+    )
+    await db.commit()
+    
+    return result_attendances
+
+
+
+@router.post("/sync", response_model=List[AttendanceSyncResult])
+async def sync_attendance(
+    sync_data: AttendanceSyncRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Replay attendance marked offline. Blocks already applied (same idempotency key) are skipped."""
+    group_ids = {block.group_id for block in sync_data.blocks}
+    groups_result = await db.execute(select(Group).where(Group.id.in_(group_ids)))
+    groups = {group.id: group for group in groups_result.scalars()}
+    
+    results = []
+    for block in sync_data.blocks:
+        group = groups.get(block.group_id)
+        if not group:
+            results.append(AttendanceSyncResult(
+                idempotency_key=block.idempotency_key, status="error", detail="Group not found"
+            ))
+            continue
+        if not current_user.is_admin and group.trainer_id != current_user.id:
+            results.append(AttendanceSyncResult(
+                idempotency_key=block.idempotency_key, status="error", detail="Not authorized to access this group"
+            ))
             continue
         
-        if existing_attendance:
-            # Update existing record
-            old_status = existing_attendance.status
-            existing_attendance.status = status_value
-            existing_attendance.notes = notes
-            existing_attendance.marked_by = current_user.id
-            
-            # If changing to TRANSFERRED, create partial payment for next month
-            if old_status != AttendanceStatus.TRANSFERRED and status_value == AttendanceStatus.TRANSFERRED:
-                # Get active subscription
-                subscription_result = await db.execute(
-                    select(Subscription).where(
-                        Subscription.student_id == student_id,
-                        Subscription.is_active == True
-                    ).order_by(Subscription.created_at.desc()).limit(1)
-                )
-                subscription = subscription_result.scalars().first()
-                
-                if subscription:
-                    # Get group
-                    group_result = await db.execute(
-                        select(Group).where(Group.id == attendance_data.group_id)
+        try:
+            # Каждый блок в своей точке сохранения: ошибка откатывает только его
+            async with db.begin_nested():
+                # Ключ фиксируется вместе с отметками, повтор ничего не вставит
+                key_result = await db.execute(
+                    pg_insert(AttendanceSyncKey)
+                    .values(
+                        user_id=current_user.id,
+                        idempotency_key=block.idempotency_key,
+                        group_id=block.group_id,
+                        session_date=block.session_date,
+                        created_at=datetime.utcnow()
                     )
-                    group = group_result.scalar_one_or_none()
-                    
-                    if group:
-                        # Determine sessions count
-                        sessions_count = 8 if subscription.subscription_type == SubscriptionType.EIGHT_SESSIONS else 12
-                        
-                        # Get standard price for this subscription from Settings
-                        if subscription.subscription_type == SubscriptionType.EIGHT_SESSIONS:
-                            if group.age_group == 'senior':
-                                price_key = SETTING_KEY_SUBSCRIPTION_8_SENIOR
-                                default_price = DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE
-                            else:
-                                price_key = SETTING_KEY_SUBSCRIPTION_8_JUNIOR
-                                default_price = DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE
-                        else:  # TWELVE_SESSIONS
-                            if group.age_group == 'senior':
-                                price_key = SETTING_KEY_SUBSCRIPTION_12_SENIOR
-                                default_price = DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE
-                            else:
-                                price_key = SETTING_KEY_SUBSCRIPTION_12_JUNIOR
-                                default_price = DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE
-                        
-                        # Get price from database
-                        price_result = await db.execute(
-                            select(Settings).where(Settings.key == price_key)
-                        )
-                        price_setting = price_result.scalar_one_or_none()
-                        standard_price = int(price_setting.value) if price_setting else default_price
-                        
-                        # Check if there's an actual payment for current month
-                        current_month = session_date.month
-                        current_year = session_date.year
-                        
-                        existing_payment_result = await db.execute(
-                            select(func.sum(Payment.amount)).where(
-                                Payment.student_id == student_id,
-                                func.extract('month', Payment.payment_month) == current_month,
-                                func.extract('year', Payment.payment_month) == current_year
-                            )
-                        )
-                        actual_paid_amount = existing_payment_result.scalar()
-                        
-                        # Use actual paid amount if exists, otherwise use standard price
-                        base_price = Decimal(str(actual_paid_amount)) if actual_paid_amount else Decimal(str(standard_price))
-                        session_cost = base_price / Decimal(str(sessions_count))
-                        
-                        # Calculate next month
-                        next_month = session_date + relativedelta(months=1)
-                        next_month = next_month.replace(day=1)
-                        
-                        # Create payment for next month
-                        payment = Payment(
-                            student_id=student_id,
-                            subscription_id=subscription.id,
-                            amount=session_cost,
-                            payment_date=next_month,
-                            payment_month=next_month,
-                            payment_type=PaymentType.PARTIAL,
-                            status=PaymentStatus.PENDING,
-                            notes=f"Автоматическая компенсация за перенос от {session_date.strftime('%d.%m.%Y')}"
-                        )
-                        db.add(payment)
-            
-            result_attendances.append(existing_attendance)
-        else:
-            # Get active subscription for the student (most recent)
-            subscription_result = await db.execute(
-                select(Subscription).where(
-                    Subscription.student_id == student_id,
-                    Subscription.is_active == True
-                ).order_by(Subscription.created_at.desc()).limit(1)
-            )
-            subscription = subscription_result.scalars().first()
-            
-            # Create new attendance record
-            new_attendance = Attendance(
-                student_id=student_id,
-                group_id=attendance_data.group_id,
-                session_date=session_date,
-                status=status_value,
-                subscription_id=subscription.id if subscription else None,
-                marked_by=current_user.id,
-                notes=notes
-            )
-            
-            db.add(new_attendance)
-            
-            # Update subscription if present and not transferred
-            if subscription and status_value == AttendanceStatus.PRESENT:
-                if subscription.remaining_sessions > 0:
-                    subscription.remaining_sessions -= 1
-                    if subscription.remaining_sessions == 0:
-                        subscription.is_active = False
-            
-            # Create partial payment for next month if transferred
-            if status_value == AttendanceStatus.TRANSFERRED and subscription:
-                # Get group to determine age group
-                group_result = await db.execute(
-                    select(Group).where(Group.id == attendance_data.group_id)
+                    .on_conflict_do_nothing()
+                    .returning(AttendanceSyncKey.idempotency_key)
                 )
-                group = group_result.scalar_one_or_none()
+                if key_result.scalar_one_or_none() is None:
+                    results.append(AttendanceSyncResult(
+                        idempotency_key=block.idempotency_key, status="duplicate"
+                    ))
+                    continue
                 
-                if group:
-                    # Determine sessions count
-                    sessions_count = 8 if subscription.subscription_type == SubscriptionType.EIGHT_SESSIONS else 12
-                    
-                    # Get standard price for this subscription from Settings
-                    if subscription.subscription_type == SubscriptionType.EIGHT_SESSIONS:
-                        if group.age_group == 'senior':
-                            price_key = SETTING_KEY_SUBSCRIPTION_8_SENIOR
-                            default_price = DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE
-                        else:
-                            price_key = SETTING_KEY_SUBSCRIPTION_8_JUNIOR
-                            default_price = DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE
-                    else:  # TWELVE_SESSIONS
-                        if group.age_group == 'senior':
-                            price_key = SETTING_KEY_SUBSCRIPTION_12_SENIOR
-                            default_price = DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE
-                        else:
-                            price_key = SETTING_KEY_SUBSCRIPTION_12_JUNIOR
-                            default_price = DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE
-                    
-                    # Get price from database
-                    price_result = await db.execute(
-                        select(Settings).where(Settings.key == price_key)
-                    )
-                    price_setting = price_result.scalar_one_or_none()
-                    standard_price = int(price_setting.value) if price_setting else default_price
-                    
-                    # Check if there's an actual payment for current month
-                    current_month = session_date.month
-                    current_year = session_date.year
-                    
-                    existing_payment_result = await db.execute(
-                        select(func.sum(Payment.amount)).where(
-                            Payment.student_id == student_id,
-                            func.extract('month', Payment.payment_month) == current_month,
-                            func.extract('year', Payment.payment_month) == current_year
-                        )
-                    )
-                    actual_paid_amount = existing_payment_result.scalar()
-                    
-                    # Use actual paid amount if exists, otherwise use standard price
-                    base_price = Decimal(str(actual_paid_amount)) if actual_paid_amount else Decimal(str(standard_price))
-                    session_cost = base_price / Decimal(str(sessions_count))
-                    
-                    # Calculate next month (first day of next month)
-                    next_month = session_date + relativedelta(months=1)
-                    next_month = next_month.replace(day=1)
-                    
-                    # Create payment for next month
-                    payment = Payment(
-                        student_id=student_id,
-                        subscription_id=subscription.id,
-                        amount=session_cost,
-                        payment_date=next_month,
-                        payment_month=next_month,
-                        payment_type=PaymentType.PARTIAL,
-                        status=PaymentStatus.PENDING,
-                        notes=f"Автоматическая компенсация за перенос от {session_date.strftime('%d.%m.%Y')}"
-                    )
-                    db.add(payment)
-            
-            result_attendances.append(new_attendance)
+                marked = await _apply_marks(db, group, block.session_date, block.attendances, current_user)
+        except HTTPException as e:
+            results.append(AttendanceSyncResult(
+                idempotency_key=block.idempotency_key, status="error", detail=str(e.detail)
+            ))
+            continue
+        except DBAPIError as e:
+            # Ошибки базы (в т.ч. IntegrityError) откатывают только этот блок;
+            # остальные исключения - ошибки кода, они пробрасываются
+            print(f"ERROR syncing attendance block {block.idempotency_key}: {type(e).__name__}: {e.orig}")
+            results.append(AttendanceSyncResult(
+                idempotency_key=block.idempotency_key, status="error", detail="Failed to apply block"
+            ))
+            continue
+        
+        results.append(AttendanceSyncResult(
+            idempotency_key=block.idempotency_key,
+            status="applied",
+            attendances=[AttendanceResponse.model_validate(attendance) for attendance in marked]
+        ))
     
     await db.commit()
     
-    # Refresh all attendances
-    for attendance in result_attendances:
-        await db.refresh(attendance)
+    return results
+
+
+def _apply_history_page(
+    query,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    cursor: Optional[str],
+    limit: int
+):
+    """Apply date range and keyset pagination on (session_date, id), newest first."""
+    if date_from is not None:
+        query = query.where(Attendance.session_date >= date_from)
+    if date_to is not None:
+        query = query.where(Attendance.session_date <= date_to)
     
-    return result_attendances
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            after = (date.fromisoformat(cursor_date), uuid.UUID(cursor_id))
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(tuple_(Attendance.session_date, Attendance.id) < after)
+    
+    # One extra row tells whether there is a next page
+    return query.order_by(Attendance.session_date.desc(), Attendance.id.desc()).limit(limit + 1)
+
+
+def _set_next_cursor(response: Response, attendances: list, limit: int) -> list:
+    """Trim the extra row and expose the next page cursor in a header."""
+    if len(attendances) > limit:
+        attendances = attendances[:limit]
+        last = attendances[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.session_date.isoformat(), last.id)
+    return attendances
 
 
 @router.get("/group/{group_id}", response_model=List[AttendanceWithDetails])
 async def get_group_attendance(
     group_id: uuid.UUID,
+    response: Response,
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Get attendance history for a group."""
-    # Verify group access
-    await check_group_access(group_id, current_user, db)
-    
-    result = await db.execute(
-        select(Attendance, Student.full_name, Student.group_id)
+    """Get attendance history for a group, newest first.
+    
+    Returns at most `limit` records (MAX_PAGE_SIZE by default, enough for
+    clients that expect the whole history); the cursor for the next page is
+    sent in the X-Next-Cursor header.
+    """
+    query = (
+        select(Attendance, Student.full_name)
         .join(Student, Attendance.student_id == Student.id)
-        .where(Attendance.group_id == group_id)
-        .order_by(Attendance.session_date.desc())
+        .where(Attendance.group_id == group_id, group_scope_filter(Attendance.group_id, current_user))
     )
+    result = await db.execute(_apply_history_page(query, date_from, date_to, cursor, limit))
     
     attendance_records = result.all()
+    if not attendance_records:
+        # Пустая страница: группы нет, нет доступа или просто нет записей
+        await check_group_access(group_id, current_user, db)
+    page = _set_next_cursor(response, [attendance for attendance, _ in attendance_records], limit)
+    student_names = {attendance.id: student_name for attendance, student_name in attendance_records}
     
     return [
         AttendanceWithDetails(
             **attendance.__dict__,
-            student_name=student_name,
+            student_name=student_names[attendance.id],
             group_name=str(group_id)
         )
-        for attendance, student_name, _ in attendance_records
+        for attendance in page
     ]
 
 
 @router.get("/student/{student_id}", response_model=List[AttendanceResponse])
 async def get_student_attendance(
     student_id: uuid.UUID,
+    response: Response,
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Get attendance history for a student."""
-    # Verify student access
-    from app.core.permissions import check_student_access
-    await check_student_access(student_id, current_user, db)
-    
-    result = await db.execute(
-        select(Attendance)
-        .where(Attendance.student_id == student_id)
-        .order_by(Attendance.session_date.desc())
+    """Get attendance history for a student, newest first.
+    
+    Returns at most `limit` records (MAX_PAGE_SIZE by default, enough for
+    clients that expect the whole history); the cursor for the next page is
+    sent in the X-Next-Cursor header.
+    """
+    query = select(Attendance).where(
+        Attendance.student_id == student_id,
+        student_scope_filter(Attendance.student_id, current_user)
     )
+    result = await db.execute(_apply_history_page(query, date_from, date_to, cursor, limit))
+    
     attendances = result.scalars().all()
+    if not attendances:
+        await check_student_access(student_id, current_user, db)
     
-    return attendances
+    return _set_next_cursor(response, attendances, limit)
 
 
 @router.put("/{attendance_id}", response_model=AttendanceResponse)
@@ -357,26 +490,27 @@ async def update_attendance(
     attendance_id: uuid.UUID,
     attendance_data: AttendanceUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Update an attendance record."""
-    result = await db.execute(select(Attendance).where(Attendance.id == attendance_id))
-    attendance = result.scalar_one_or_none()
-    
-    if not attendance:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Attendance record not found"
-        )
+    # Access is checked through the group in the same query; the row stays
+    # locked so the rollup delta uses the current status
+    attendance = await get_group_resource(
+        Attendance, attendance_id, current_user, db, "Attendance record not found",
+        for_update=True
+    )
     
-    # Verify access through group
-    await check_group_access(attendance.group_id, current_user, db)
+    old_status = attendance.status
     
     # Update fields
     update_data = attendance_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(attendance, field, value)
     
+    rollup_deltas = RollupDeltas()
+    rollup_deltas.track(attendance.group_id, attendance.student_id, attendance.session_date, old_status, attendance.status)
+    await apply_rollup_deltas(db, rollup_deltas)
+    
     await db.commit()
     await db.refresh(attendance)
     
@@ -387,20 +521,19 @@ async def update_attendance(
 async def delete_attendance(
     attendance_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Delete an attendance record."""
-    result = await db.execute(select(Attendance).where(Attendance.id == attendance_id))
-    attendance = result.scalar_one_or_none()
-    
-    if not attendance:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Attendance record not found"
-        )
+    # Access is checked through the group in the same query; the row stays
+    # locked so the rollup delta uses the current status
+    attendance = await get_group_resource(
+        Attendance, attendance_id, current_user, db, "Attendance record not found",
+        for_update=True
+    )
     
-    # Verify access through group
-    await check_group_access(attendance.group_id, current_user, db)
+    rollup_deltas = RollupDeltas()
+    rollup_deltas.track(attendance.group_id, attendance.student_id, attendance.session_date, attendance.status, None)
+    await apply_rollup_deltas(db, rollup_deltas)
     
     await db.delete(attendance)
     await db.commit()
@@ -413,7 +546,7 @@ async def get_attendance_by_date(
     group_id: uuid.UUID,
     session_date: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get attendance records for a specific group and date."""
     from datetime import datetime
@@ -432,15 +565,7 @@ async def get_attendance_by_date(
     
     # Get all students in the group (including those with this group as additional)
     students_result = await db.execute(
-        select(Student).where(
-            and_(
-                or_(
-                    Student.group_id == group_id,
-                    group_id == any_(Student.additional_group_ids)
-                ),
-                Student.is_active == True
-            )
-        ).order_by(Student.full_name)
+        group_roster_query(group_id)
     )
     students = students_result.scalars().all()
     
@@ -481,21 +606,46 @@ async def get_attendance_statistics(
     year: int = None,
     month: int = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get attendance statistics by groups and overall."""
-    from datetime import date
-    from app.models.group import Group
-    
     # Use current year/month if not specified
     if year is None:
         year = date.today().year
     if month is None:
         month = date.today().month
     
-    # Get all groups
-    groups_result = await db.execute(select(Group))
-    groups = groups_result.scalars().all()
+    # Sum monthly rollup counters for every group in one grouped query.
+    # Only groups with sessions are included.
+    present_sum = func.sum(AttendanceMonthlyRollup.present_count)
+    absent_sum = func.sum(AttendanceMonthlyRollup.absent_count)
+    transferred_sum = func.sum(AttendanceMonthlyRollup.transferred_count)
+    total_sum = present_sum + absent_sum + transferred_sum
+    
+    stats_query = (
+        select(
+            Group.id,
+            Group.name,
+            total_sum.label('total'),
+            present_sum.label('present'),
+            absent_sum.label('absent'),
+            transferred_sum.label('transferred')
+        )
+        .join(AttendanceMonthlyRollup, AttendanceMonthlyRollup.group_id == Group.id)
+        .where(
+            AttendanceMonthlyRollup.year == year,
+            AttendanceMonthlyRollup.month == month
+        )
+        .group_by(Group.id, Group.name)
+        .having(total_sum > 0)
+        .order_by(Group.name)
+    )
+    
+    # Trainers see only their own groups
+    if not current_user.is_admin:
+        stats_query = stats_query.where(Group.trainer_id == current_user.id)
+    
+    stats_result = await db.execute(stats_query)
     
     group_stats = []
     total_sessions = 0
@@ -503,45 +653,28 @@ async def get_attendance_statistics(
     total_absent = 0
     total_transferred = 0
     
-    for group in groups:
-        # Count attendances by status for this group
-        stats_query = await db.execute(
-            select(
-                func.count(Attendance.id).label('total'),
-                func.sum(case((Attendance.status == AttendanceStatus.PRESENT, 1), else_=0)).label('present'),
-                func.sum(case((Attendance.status == AttendanceStatus.ABSENT, 1), else_=0)).label('absent'),
-                func.sum(case((Attendance.status == AttendanceStatus.TRANSFERRED, 1), else_=0)).label('transferred')
-            )
-            .where(
-                Attendance.group_id == group.id,
-                func.extract('year', Attendance.session_date) == year,
-                func.extract('month', Attendance.session_date) == month
-            )
-        )
+    for group_id, group_name, total, present, absent, transferred in stats_result.all():
+        total = int(total or 0)
+        present = int(present or 0)
+        absent = int(absent or 0)
+        transferred = int(transferred or 0)
         
-        stats = stats_query.first()
-        total = int(stats[0] or 0)
-        present = int(stats[1] or 0)
-        absent = int(stats[2] or 0)
-        transferred = int(stats[3] or 0)
+        attendance_rate = (present / total * 100) if total > 0 else 0
         
-        if total > 0:  # Only include groups with sessions
-            attendance_rate = (present / total * 100) if total > 0 else 0
-            
-            group_stats.append({
-                'group_id': str(group.id),
-                'group_name': group.name,
-                'total_sessions': total,
-                'present': present,
-                'absent': absent,
-                'transferred': transferred,
-                'attendance_rate': round(attendance_rate, 2)
-            })
-            
-            total_sessions += total
-            total_present += present
-            total_absent += absent
-            total_transferred += transferred
+        group_stats.append({
+            'group_id': str(group_id),
+            'group_name': group_name,
+            'total_sessions': total,
+            'present': present,
+            'absent': absent,
+            'transferred': transferred,
+            'attendance_rate': round(attendance_rate, 2)
+        })
+        
+        total_sessions += total
+        total_present += present
+        total_absent += absent
+        total_transferred += transferred
     
     overall_rate = (total_present / total_sessions * 100) if total_sessions > 0 else 0
     
@@ -565,13 +698,11 @@ async def get_group_attendance_detail(
     year: int = None,
     month: int = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get detailed attendance calendar for a specific group."""
-    from calendar import monthrange
-    
     # Verify group access
-    await check_group_access(group_id, current_user, db)
+    group = await check_group_access(group_id, current_user, db)
     
     # Use current year/month if not specified
     if year is None:
@@ -579,46 +710,12 @@ async def get_group_attendance_detail(
     if month is None:
         month = date.today().month
     
-    # Get group info
-    group_result = await db.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
-    
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
-    
-    # Determine training days based on schedule_type
-    training_days = []
-    if group.schedule_type.value == 'mon_wed_fri':
-        training_days = [0, 2, 4]  # Monday, Wednesday, Friday
-    elif group.schedule_type.value == 'tue_thu':
-        training_days = [1, 3]  # Tuesday, Thursday
-    else:
-        # Default to all weekdays if unknown type
-        training_days = [0, 1, 2, 3, 4]
-    
     # Get all training dates in the month
-    _, last_day = monthrange(year, month)
-    training_dates = []
-    
-    for day in range(1, last_day + 1):
-        current_date = date(year, month, day)
-        if current_date.weekday() in training_days:
-            training_dates.append(current_date)
+    training_dates = get_month_session_dates(group, year, month)
     
     # Get all active students in the group
     students_result = await db.execute(
-        select(Student).where(
-            and_(
-                or_(
-                    Student.group_id == group_id,
-                    group_id == any_(Student.additional_group_ids)
-                ),
-                Student.is_active == True
-            )
-        ).order_by(Student.full_name)
+        group_roster_query(group_id)
     )
     students = students_result.scalars().all()
     
@@ -627,8 +724,7 @@ async def get_group_attendance_detail(
         select(Attendance).where(
             and_(
                 Attendance.group_id == group_id,
-                func.extract('year', Attendance.session_date) == year,
-                func.extract('month', Attendance.session_date) == month
+                month_filter(Attendance.session_date, year, month)
             )
         )
     )
@@ -667,3 +763,108 @@ async def get_group_attendance_detail(
         'training_dates': [d.isoformat() for d in training_dates],
         'students': students_data
     }
+
+
+# One-character codes used by the compact attendance matrix
+MATRIX_STATUS_CODES = {
+    AttendanceStatus.PRESENT: 'P',
+    AttendanceStatus.ABSENT: 'A',
+    AttendanceStatus.TRANSFERRED: 'T',
+}
+MATRIX_NO_STATUS_CODE = '.'
+
+
+@router.get("/statistics/matrix")
+async def get_attendance_matrix(
+    year: int = None,
+    month: int = None,
+    group_ids: Optional[List[uuid.UUID]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Get a compact attendance matrix for all accessible groups in a month.
+    
+    Training days are listed once per group; each student's row is a string
+    with one status code per training day (see 'codes' in the response).
+    """
+    # Use current year/month if not specified
+    if year is None:
+        year = date.today().year
+    if month is None:
+        month = date.today().month
+    
+    groups_query = select(Group).order_by(Group.name)
+    if group_ids:
+        groups_query = groups_query.where(Group.id.in_(group_ids))
+    
+    # Trainers see only their own groups
+    groups_query = scope_to_trainer(groups_query, Group.trainer_id, current_user)
+    
+    groups_result = await db.execute(groups_query)
+    groups = groups_result.scalars().all()
+    
+    response = {
+        'year': year,
+        'month': month,
+        'codes': {
+            **{status.value: code for status, code in MATRIX_STATUS_CODES.items()},
+            'none': MATRIX_NO_STATUS_CODE
+        },
+        'groups': []
+    }
+    
+    if not groups:
+        return response
+    
+    ids = [group.id for group in groups]
+    
+    # Active students of all groups (primary or additional)
+    students_result = await db.execute(
+        select(Student.id, Student.full_name, Student.group_id, Student.additional_group_ids)
+        .where(
+            groups_members_filter(ids),
+            Student.is_active == True
+        )
+        .order_by(Student.full_name)
+    )
+    students = students_result.all()
+    
+    # All attendance records of these groups for the month in one query
+    attendances_result = await db.execute(
+        select(Attendance.group_id, Attendance.student_id, Attendance.session_date, Attendance.status)
+        .where(
+            Attendance.group_id.in_(ids),
+            month_filter(Attendance.session_date, year, month)
+        )
+    )
+    
+    # Build attendance map: (group_id, student_id, date) -> code
+    attendance_map = {
+        (group_id, student_id, session_date): MATRIX_STATUS_CODES[status_value]
+        for group_id, student_id, session_date, status_value in attendances_result.all()
+    }
+    
+    for group in groups:
+        training_dates = get_month_session_dates(group, year, month)
+        
+        rows = []
+        for student_id, full_name, primary_group_id, additional_group_ids in students:
+            if primary_group_id != group.id and group.id not in (additional_group_ids or []):
+                continue
+            rows.append({
+                'student_id': str(student_id),
+                'full_name': full_name,
+                'attendance': ''.join(
+                    attendance_map.get((group.id, student_id, training_date), MATRIX_NO_STATUS_CODE)
+                    for training_date in training_dates
+                )
+            })
+        
+        response['groups'].append({
+            'group_id': str(group.id),
+            'group_name': group.name,
+            'training_days': [training_date.day for training_date in training_dates],
+            'students': rows
+        })
+    
+    return response
@@ -6,14 +6,22 @@ from sqlalchemy import select
 
 from app.database import get_db
 from app.models.user import User
-from app.schemas.user import UserCreate, UserResponse, UserLogin, Token
+from app.schemas.user import UserCreate, UserResponse, UserLogin, Token, RefreshTokenRequest, RevokeTokensRequest
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
     create_access_token,
     get_current_user,
     get_current_admin_user
 )
+from app.core.user_cache import UserSnapshot
+from app.core.refresh_tokens import (
+    issue_refresh_token,
+    consume_refresh_token,
+    revoke_refresh_token,
+    revoke_user_tokens
+)
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -22,7 +30,7 @@ router = APIRouter(prefix="/api/auth", tags=["auth"])
 async def register_user(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Register a new trainer (admin only)."""
     # Check if username exists
@@ -46,7 +54,7 @@ async def register_user(
         username=user_data.username,
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
         is_admin=user_data.is_admin
     )
     
@@ -67,7 +75,7 @@ async def login(
     result = await db.execute(select(User).where(User.username == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -80,15 +88,84 @@ async def login(
             detail="Inactive user"
         )
     
-    # Create access token
+    # Work factor changed - upgrade the stored hash while we know the password
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(form_data.password)
+    
+    # Create access and refresh tokens
     access_token = create_access_token(data={"sub": str(user.id)})
+    refresh_token = await issue_refresh_token(db, user.id)
+    await db.commit()
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    token_data: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Exchange a refresh token for a new access token and a new refresh token."""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    user_id = await consume_refresh_token(db, token_data.refresh_token)
+    if user_id is None:
+        # Фиксируем отзыв токенов при повторном использовании
+        await db.commit()
+        raise credentials_exception
+    
+    is_active = await db.scalar(select(User.is_active).where(User.id == user_id))
+    if not is_active:
+        await db.rollback()
+        raise credentials_exception
+    
+    access_token = create_access_token(data={"sub": str(user_id)})
+    refresh_token = await issue_refresh_token(db, user_id)
+    await db.commit()
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token_data: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke a refresh token."""
+    await revoke_refresh_token(db, token_data.refresh_token)
+    await db.commit()
+    
+    return None
+
+
+@router.post("/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_tokens(
+    revoke_data: RevokeTokensRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Revoke all refresh and access tokens of a user (other users: admin only)."""
+    user_id = revoke_data.user_id or current_user.id
+    
+    if user_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    await revoke_user_tokens(db, user_id)
+    await db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return None
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get current user information."""
     return current_user
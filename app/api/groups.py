@@ -1,94 +1,125 @@
 """Groups API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List
+from sqlalchemy import select, func, update, insert, delete, cast, true
+from typing import List, Optional
 import uuid
-from datetime import date, timedelta
-from decimal import Decimal
+from datetime import date, datetime
 
 from app.database import get_db
-from app.models.user import User
-from app.models.group import Group, AgeGroup
+from app.models.group import Group
 from app.models.student import Student
 from app.models.subscription import Subscription, SubscriptionType
+from app.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.schemas.group import GroupCreate, GroupUpdate, GroupResponse, GroupWithStudentCount
 from app.core.security import get_current_user
-from app.core.permissions import check_group_access
-from app.constants import (
-    DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE
-)
+from app.core.user_cache import UserSnapshot
+from app.core.pricing import get_subscription_params
+from app.core.permissions import check_group_access, group_scope_filter
+from app.utils.training_calendar import is_session_day
+from app.utils.pagination import keyset_after, split_page, parse_fields, dump_fields, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/api/groups", tags=["groups"])
 
 
-def get_subscription_params(subscription_type: SubscriptionType, age_group: AgeGroup):
-    """Get subscription parameters based on type and age group."""
-    if subscription_type == SubscriptionType.EIGHT_SESSIONS:
-        total_sessions = 8
-        if age_group == AgeGroup.SENIOR:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE))
-        else:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE))
-    else:  # TWELVE_SESSIONS
-        total_sessions = 12
-        if age_group == AgeGroup.SENIOR:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE))
-        else:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE))
+@router.get("", response_model=List[GroupWithStudentCount])
+async def get_groups(
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated GroupWithStudentCount fields, e.g. id,name"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Get all groups for the current trainer.
     
-    # Expiry date: 2 months from start date
-    expiry_date = date.today() + timedelta(days=60)
+    Newest first by default. Pagination is opt-in: with `limit` or `cursor`
+    groups are ordered by (name, id), at most `limit` are returned and the
+    next page cursor is sent in the X-Next-Cursor header. `fields` limits the
+    selected and returned attributes.
+    """
+    try:
+        selected = parse_fields(fields, GroupWithStudentCount.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    return {
-        'total_sessions': total_sessions,
-        'remaining_sessions': total_sessions,
-        'price': price,
-        'expiry_date': expiry_date
-    }
+    columns = selected or list(GroupWithStudentCount.model_fields)
+    
+    # id и name нужны всегда - это ключ сортировки
+    expressions = {'id': Group.id, 'name': Group.name}
+    for name in columns:
+        if name != 'student_count':
+            expressions[name] = getattr(Group, name)
+    if 'student_count' in columns:
+        expressions['student_count'] = func.count(Student.id)
+    
+    query = select(*[expression.label(name) for name, expression in expressions.items()]).select_from(Group)
+    if 'student_count' in columns:
+        query = query.outerjoin(Student, Group.id == Student.group_id).group_by(Group.id)
+    
+    # Admins see all groups, trainers see only their own
+    if not current_user.is_admin:
+        query = query.where(Group.trainer_id == current_user.id)
+    
+    paginate = cursor is not None or limit is not None
+    if paginate:
+        if cursor:
+            try:
+                query = query.where(keyset_after((Group.name, Group.id), cursor, (str, uuid.UUID)))
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+        limit = limit or DEFAULT_PAGE_SIZE
+        # One extra row tells whether there is a next page
+        query = query.order_by(Group.name, Group.id).limit(limit + 1)
+    else:
+        query = query.order_by(Group.created_at.desc())
+    
+    result = await db.execute(query)
+    rows = result.mappings().all()
+    
+    next_cursor = None
+    if paginate:
+        rows, next_cursor = split_page(rows, limit, lambda row: (row['name'], row['id']))
+    
+    if selected is None:
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return [GroupWithStudentCount(**row) for row in rows]
+    
+    # Sparse fieldset: только запрошенные поля, но через ту же модель ответа
+    return JSONResponse(
+        content=[dump_fields(GroupWithStudentCount, row, selected) for row in rows],
+        headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    )
 
 
-@router.get("", response_model=List[GroupWithStudentCount])
-async def get_groups(
+@router.get("/today", response_model=List[GroupResponse])
+async def get_today_groups(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Get all groups for the current trainer."""
+    """Get active groups that have a training session today."""
+    query = select(Group).where(Group.is_active == True).order_by(Group.name)
+    
     # Admins see all groups, trainers see only their own
-    if current_user.is_admin:
-        result = await db.execute(
-            select(Group, func.count(Student.id).label("student_count"))
-            .outerjoin(Student, Group.id == Student.group_id)
-            .group_by(Group.id)
-            .order_by(Group.created_at.desc())
-        )
-    else:
-        result = await db.execute(
-            select(Group, func.count(Student.id).label("student_count"))
-            .outerjoin(Student, Group.id == Student.group_id)
-            .where(Group.trainer_id == current_user.id)
-            .group_by(Group.id)
-            .order_by(Group.created_at.desc())
-        )
+    if not current_user.is_admin:
+        query = query.where(Group.trainer_id == current_user.id)
     
-    groups_with_counts = result.all()
+    result = await db.execute(query)
+    today = date.today()
     
-    return [
-        GroupWithStudentCount(
-            **{**group.__dict__, "student_count": count}
-        )
-        for group, count in groups_with_counts
-    ]
+    return [group for group in result.scalars().all() if is_session_day(group, today)]
 
 
 @router.post("", response_model=GroupResponse, status_code=status.HTTP_201_CREATED)
 async def create_group(
     group_data: GroupCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Create a new group."""
     new_group = Group(
@@ -107,7 +138,7 @@ async def create_group(
 async def get_group(
     group_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get a specific group."""
     group = await check_group_access(group_id, current_user, db)
@@ -119,139 +150,179 @@ async def update_group(
     group_id: uuid.UUID,
     group_data: GroupUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Update a group."""
+    """Update a group.
+    
+    If default_subscription_type changes, active students of the group get a
+    new subscription of that type in the same transaction.
+    """
     try:
         group = await check_group_access(group_id, current_user, db)
         
         # Get only fields that were actually set in the request
         update_data = group_data.model_dump(exclude_unset=True)
-        print(f"DEBUG: Update data received: {update_data}")
         
         # Check if subscription type is being changed
-        subscription_type_changed = False
-        new_subscription_type = None
-        
-        if 'default_subscription_type' in update_data:
-            new_value = update_data['default_subscription_type']
-            old_value = group.default_subscription_type
-            print(f"DEBUG: Subscription type check - Old: {old_value}, New: {new_value}")
-            if new_value != old_value and new_value is not None:
-                subscription_type_changed = True
-                new_subscription_type = new_value
-                print(f"DEBUG: Subscription type CHANGED! Will update students.")
+        new_value = update_data.get('default_subscription_type')
+        subscription_type_changed = new_value is not None and new_value != group.default_subscription_type
         
         # Update fields
         for field, value in update_data.items():
             setattr(group, field, value)
         
+        if subscription_type_changed:
+            rotated = await _rotate_group_subscriptions(db, group, SubscriptionType(new_value))
+            print(f"INFO: Group {group_id} subscription type changed to {new_value}, rotated {rotated} subscriptions")
+        
         await db.commit()
-        print(f"DEBUG: Group updated successfully")
     except Exception as e:
-        print(f"ERROR in update_group (before subscription update): {type(e).__name__}: {str(e)}")
+        print(f"ERROR in update_group: {type(e).__name__}: {str(e)}")
         await db.rollback()
         raise
     
-    # If subscription type changed, update all students' subscriptions
-    if subscription_type_changed and new_subscription_type:
-        try:
-            print(f"DEBUG: Starting subscription update for group {group_id}")
-            
-            # Get all students in this group
-            students_result = await db.execute(
-                select(Student).where(
-                    Student.group_id == group_id,
-                    Student.is_active == True
-                )
-            )
-            students = students_result.scalars().all()
-            print(f"DEBUG: Found {len(students)} active students in group")
-            
-            # Step 1: Deactivate all old subscriptions first
-            deactivated_count = 0
-            for student in students:
-                old_subs_result = await db.execute(
-                    select(Subscription).where(
-                        Subscription.student_id == student.id,
-                        Subscription.is_active == True
-                    )
-                )
-                for old_sub in old_subs_result.scalars():
-                    old_sub.is_active = False
-                    deactivated_count += 1
-            
-            print(f"DEBUG: Deactivated {deactivated_count} old subscriptions")
-            
-            # Commit deactivation to remove unique constraint conflict
-            await db.commit()
-            print(f"DEBUG: Committed deactivation")
-            
-            # Step 2: Create new subscriptions
-            for student in students:
-                # Get subscription parameters based on type and student's group age
-                subscription_params = get_subscription_params(
-                    SubscriptionType(new_subscription_type),
-                    group.age_group
-                )
-                
-                new_subscription = Subscription(
-                    student_id=student.id,
-                    subscription_type=SubscriptionType(new_subscription_type),
-                    start_date=date.today(),
-                    is_active=True,
-                    **subscription_params  # total_sessions, remaining_sessions, price, expiry_date
-                )
-                db.add(new_subscription)
-            
-            print(f"DEBUG: Created {len(students)} new subscriptions")
-            await db.commit()
-            print(f"DEBUG: Committed new subscriptions")
-            
-        except Exception as e:
-            print(f"ERROR in subscription update: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            await db.rollback()
-            raise
-    
     await db.refresh(group)
-    print(f"DEBUG: Group refresh successful, returning response")
     
     return group
 
 
+async def _rotate_group_subscriptions(
+    db: AsyncSession,
+    group: Group,
+    subscription_type: SubscriptionType
+) -> int:
+    """Replace active subscriptions of the group's active students with new ones.
+    
+    Two statements regardless of group size; the caller commits.
+    """
+    params = await get_subscription_params(db, subscription_type, group.age_group)
+    
+    group_students = select(Student.id).where(
+        Student.group_id == group.id,
+        Student.is_active == True
+    )
+    
+    # Step 1: deactivate old subscriptions (frees the one-active-per-student index)
+    await db.execute(
+        update(Subscription)
+        .where(
+            Subscription.student_id.in_(group_students.scalar_subquery()),
+            Subscription.is_active == True
+        )
+        .values(is_active=False)
+    )
+    
+    # Step 2: one new subscription per student.
+    # Explicit casts: parameters in a SELECT list are not typed by the target table.
+    columns = Subscription.__table__.c
+    new_subscriptions = select(
+        func.gen_random_uuid(),
+        Student.id,
+        cast(subscription_type, columns.subscription_type.type),
+        cast(params['total_sessions'], columns.total_sessions.type),
+        cast(params['remaining_sessions'], columns.remaining_sessions.type),
+        cast(params['price'], columns.price.type),
+        cast(date.today(), columns.start_date.type),
+        cast(params['expiry_date'], columns.expiry_date.type),
+        true(),
+        cast(datetime.utcnow(), columns.created_at.type)
+    ).where(
+        Student.group_id == group.id,
+        Student.is_active == True
+    )
+    result = await db.execute(
+        insert(Subscription).from_select(
+            [
+                'id',
+                'student_id',
+                'subscription_type',
+                'total_sessions',
+                'remaining_sessions',
+                'price',
+                'start_date',
+                'expiry_date',
+                'is_active',
+                'created_at',
+            ],
+            new_subscriptions
+        )
+    )
+    
+    return result.rowcount
+
+
 @router.delete("/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_group(
     group_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Delete a group."""
-    group = await check_group_access(group_id, current_user, db)
+    """Delete a group with its students and their history.
     
-    await db.delete(group)
+    Child rows are removed by the database (ON DELETE CASCADE), nothing is
+    loaded into the session.
+    """
+    await check_group_access(group_id, current_user, db)
+    
+    await db.execute(delete(Group).where(Group.id == group_id))
     await db.commit()
     
     return None
 
 
+@router.post("/{group_id}/archive", response_model=GroupResponse)
+async def archive_group(
+    group_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Archive a group: deactivate it, its students and their subscriptions, keeping all history.
+    
+    Alternative to deleting large groups. Runs as set-based UPDATE statements
+    in one transaction, so the cost does not grow with the group's history
+    and a retry is harmless (already archived rows are left as they are).
+    """
+    group = await check_group_access(group_id, current_user, db)
+    
+    # Абонементы архивных учеников не должны попадать в usage и свипер
+    await db.execute(
+        update(Subscription)
+        .where(
+            Subscription.student_id.in_(select(Student.id).where(Student.group_id == group_id)),
+            Subscription.is_active == True
+        )
+        .values(is_active=False)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(Student)
+        .where(Student.group_id == group_id, Student.is_active == True)
+        .values(is_active=False)
+    )
+    group.is_active = False
+    await db.commit()
+    await db.refresh(group)
+    
+    return group
+
+
 @router.get("/{group_id}/students", response_model=List[dict])
 async def get_group_students(
     group_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get all students in a group."""
-    group = await check_group_access(group_id, current_user, db)
-    
     result = await db.execute(
         select(Student)
-        .where(Student.group_id == group_id)
+        .where(Student.group_id == group_id, group_scope_filter(Student.group_id, current_user))
         .order_by(Student.full_name)
     )
     students = result.scalars().all()
     
+    if not students:
+        await check_group_access(group_id, current_user, db)
+    
     return [
         {
             "id": str(student.id),
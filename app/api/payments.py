@@ -1,13 +1,12 @@
 """Payments API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, extract
-from typing import List
+from typing import List, Optional
 from decimal import Decimal
 import uuid
 
 from app.database import get_db
-from app.models.user import User
 from app.models.payment import Payment, PaymentStatus
 from app.models.student import Student
 from app.models.subscription import Subscription
@@ -19,8 +18,10 @@ from app.schemas.payment import (
     MonthlyPaymentSummary
 )
 from app.core.security import get_current_user
-from app.core.permissions import check_student_access
-from app.utils.date_helpers import get_month_range
+from app.core.user_cache import UserSnapshot
+from app.core.permissions import check_student_access, get_student_resource, student_scope_filter
+from app.constants import MAX_PAGE_SIZE
+from app.utils.date_helpers import get_month_range, year_filter
 
 router = APIRouter(prefix="/api/payments", tags=["payments"])
 
@@ -29,7 +30,7 @@ router = APIRouter(prefix="/api/payments", tags=["payments"])
 async def create_payment(
     payment_data: PaymentCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Register a new payment."""
     # Verify student access
@@ -48,19 +49,22 @@ async def create_payment(
 async def get_student_payments(
     student_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get all payments for a student."""
-    # Verify student access
-    await check_student_access(student_id, current_user, db)
-    
     result = await db.execute(
         select(Payment)
-        .where(Payment.student_id == student_id)
+        .where(
+            Payment.student_id == student_id,
+            student_scope_filter(Payment.student_id, current_user)
+        )
         .order_by(Payment.payment_date.desc())
     )
     payments = result.scalars().all()
     
+    if not payments:
+        await check_student_access(student_id, current_user, db)
+    
     return payments
 
 
@@ -69,7 +73,7 @@ async def get_monthly_payments(
     year: int,
     month: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get all payments for a specific month."""
     first_day, last_day = get_month_range(year, month)
@@ -117,20 +121,11 @@ async def update_payment(
     payment_id: uuid.UUID,
     payment_data: PaymentUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Update a payment."""
-    result = await db.execute(select(Payment).where(Payment.id == payment_id))
-    payment = result.scalar_one_or_none()
-    
-    if not payment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Payment not found"
-        )
-    
-    # Verify student access
-    await check_student_access(payment.student_id, current_user, db)
+    # Access is checked through the student in the same query
+    payment = await get_student_resource(Payment, payment_id, current_user, db, "Payment not found")
     
     # Update fields
     update_data = payment_data.model_dump(exclude_unset=True)
@@ -147,20 +142,11 @@ async def update_payment(
 async def delete_payment(
     payment_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Delete a payment."""
-    result = await db.execute(select(Payment).where(Payment.id == payment_id))
-    payment = result.scalar_one_or_none()
-    
-    if not payment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Payment not found"
-        )
-    
-    # Verify student access
-    await check_student_access(payment.student_id, current_user, db)
+    # Access is checked through the student in the same query
+    payment = await get_student_resource(Payment, payment_id, current_user, db, "Payment not found")
     
     await db.delete(payment)
     await db.commit()
@@ -172,7 +158,7 @@ async def delete_payment(
 async def get_payment_statistics(
     year: int = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get payment statistics grouped by month."""
     from datetime import date
@@ -194,7 +180,7 @@ async def get_payment_statistics(
             func.sum(case((Payment.status == PaymentStatus.PENDING, 1), else_=0)).label('pending_count'),
             func.sum(case((Payment.status == PaymentStatus.OVERDUE, 1), else_=0)).label('overdue_count')
         )
-        .where(extract('year', Payment.payment_month) == year)
+        .where(year_filter(Payment.payment_month, year))
     )
     
     if not current_user.is_admin:
@@ -228,10 +214,17 @@ async def get_payment_statistics(
 async def get_unpaid_students(
     year: int = None,
     month: int = None,
+    group_id: Optional[uuid.UUID] = None,
+    trainer_id: Optional[uuid.UUID] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Get list of students who haven't paid for specified month."""
+    """Get list of students who haven't paid for specified month.
+    
+    total_unpaid is the number of unpaid students across all pages.
+    """
     from datetime import date
     from app.models.group import Group
     
@@ -244,57 +237,78 @@ async def get_unpaid_students(
     # Get first day of the month
     first_day = date(year, month, 1)
     
-    # Get all active students
-    students_query = select(Student, Group.name).join(
-        Group, Student.group_id == Group.id
-    ).where(Student.is_active == True)
+    # Paid payment for this month (anti-join)
+    paid_payment = select(Payment.id).where(
+        Payment.student_id == Student.id,
+        Payment.payment_month == first_day,
+        Payment.status == PaymentStatus.PAID
+    ).exists()
     
-    if not current_user.is_admin:
-        students_query = students_query.where(Student.trainer_id == current_user.id)
-    
-    students_result = await db.execute(students_query)
-    all_students = students_result.all()
+    # Latest active subscription of each student determines expected amount
+    active_subscription = (
+        select(Subscription.student_id, Subscription.price)
+        .where(Subscription.is_active == True)
+        .distinct(Subscription.student_id)
+        .order_by(Subscription.student_id, Subscription.start_date.desc())
+        .subquery()
+    )
     
-    unpaid_students = []
+    filters = [Student.is_active == True, ~paid_payment]
+    if not current_user.is_admin:
+        filters.append(Student.trainer_id == current_user.id)
+    if trainer_id:
+        filters.append(Student.trainer_id == trainer_id)
+    if group_id:
+        filters.append(Student.group_id == group_id)
     
-    for student, group_name in all_students:
-        # Check if student has payment for this month
-        payment_check = await db.execute(
-            select(Payment).where(
-                Payment.student_id == student.id,
-                Payment.payment_month == first_day,
-                Payment.status == PaymentStatus.PAID
-            )
+    query = (
+        select(
+            Student.id,
+            Student.full_name,
+            Group.name,
+            Student.phone,
+            Student.email,
+            active_subscription.c.price,
+            func.count().over().label('total_unpaid')
         )
-        
-        payment = payment_check.scalars().first()
-        
-        if not payment:
-            # Get active subscription to determine expected amount
-            subscription_query = select(Subscription).where(
-                Subscription.student_id == student.id,
-                Subscription.is_active == True
-            ).order_by(Subscription.start_date.desc())
-            subscription_result = await db.execute(subscription_query)
-            active_subscription = subscription_result.scalars().first()
-            
-            # Calculate expected amount based on subscription
-            expected_amount = Decimal('0')
-            if active_subscription:
-                expected_amount = active_subscription.price
-            
-            unpaid_students.append({
-                'student_id': str(student.id),
-                'full_name': student.full_name,
-                'group_name': group_name,
-                'phone': student.phone,
-                'email': student.email,
-                'debt_amount': float(expected_amount)
-            })
+        .join(Group, Student.group_id == Group.id)
+        .outerjoin(active_subscription, active_subscription.c.student_id == Student.id)
+        .where(*filters)
+        .order_by(Student.full_name, Student.id)
+        .offset(offset)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    
+    rows = (await db.execute(query)).all()
+    
+    if rows:
+        total_unpaid = rows[0].total_unpaid
+    elif offset:
+        # Страница за пределами списка, считаем отдельно
+        total_unpaid = await db.scalar(
+            select(func.count(Student.id))
+            .join(Group, Student.group_id == Group.id)
+            .where(*filters)
+        )
+    else:
+        total_unpaid = 0
+    
+    unpaid_students = [
+        {
+            'student_id': str(student_id),
+            'full_name': full_name,
+            'group_name': group_name,
+            'phone': phone,
+            'email': email,
+            'debt_amount': float(price or Decimal('0'))
+        }
+        for student_id, full_name, group_name, phone, email, price, _ in rows
+    ]
     
     return {
         'year': year,
         'month': month,
-        'total_unpaid': len(unpaid_students),
+        'total_unpaid': total_unpaid,
         'students': unpaid_students
     }
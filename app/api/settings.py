@@ -5,15 +5,12 @@ from sqlalchemy import select
 from typing import List
 
 from app.database import get_db
-from app.models.user import User
 from app.models.settings import Settings
 from app.schemas.settings import SettingsCreate, SettingsUpdate, SettingsResponse, SubscriptionPrices
 from app.core.security import get_current_admin_user
+from app.core.user_cache import UserSnapshot
+from app.core import pricing
 from app.constants import (
-    DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE,
     SETTING_KEY_SUBSCRIPTION_8_SENIOR,
     SETTING_KEY_SUBSCRIPTION_8_JUNIOR,
     SETTING_KEY_SUBSCRIPTION_12_SENIOR,
@@ -30,7 +27,7 @@ router = APIRouter(prefix="/api/settings", tags=["settings"])
 @router.get("", response_model=List[SettingsResponse])
 async def get_all_settings(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Get all settings (admin only)."""
     result = await db.execute(
@@ -45,28 +42,7 @@ async def get_subscription_prices(
     db: AsyncSession = Depends(get_db)
 ):
     """Get subscription prices (public endpoint)."""
-    # Get prices for all types
-    price_keys = [
-        SETTING_KEY_SUBSCRIPTION_8_SENIOR,
-        SETTING_KEY_SUBSCRIPTION_8_JUNIOR,
-        SETTING_KEY_SUBSCRIPTION_12_SENIOR,
-        SETTING_KEY_SUBSCRIPTION_12_JUNIOR
-    ]
-    
-    prices = {}
-    defaults = {
-        SETTING_KEY_SUBSCRIPTION_8_SENIOR: DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE,
-        SETTING_KEY_SUBSCRIPTION_8_JUNIOR: DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE,
-        SETTING_KEY_SUBSCRIPTION_12_SENIOR: DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE,
-        SETTING_KEY_SUBSCRIPTION_12_JUNIOR: DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE
-    }
-    
-    for key in price_keys:
-        result = await db.execute(
-            select(Settings).where(Settings.key == key)
-        )
-        setting = result.scalar_one_or_none()
-        prices[key] = int(setting.value) if setting else defaults[key]
+    prices = await pricing.get_subscription_prices(db)
     
     return SubscriptionPrices(**prices)
 
@@ -75,7 +51,7 @@ async def get_subscription_prices(
 async def get_setting(
     key: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Get a specific setting by key (admin only)."""
     result = await db.execute(
@@ -96,7 +72,7 @@ async def get_setting(
 async def create_setting(
     setting_data: SettingsCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Create a new setting (admin only)."""
     # Check if setting already exists
@@ -116,6 +92,7 @@ async def create_setting(
     db.add(new_setting)
     await db.commit()
     await db.refresh(new_setting)
+    pricing.invalidate_prices()
     
     return new_setting
 
@@ -125,7 +102,7 @@ async def update_setting(
     key: str,
     setting_data: SettingsUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Update a setting (admin only)."""
     result = await db.execute(
@@ -146,6 +123,7 @@ async def update_setting(
     
     await db.commit()
     await db.refresh(setting)
+    pricing.invalidate_prices()
     
     return setting
 
@@ -154,7 +132,7 @@ async def update_setting(
 async def update_subscription_prices(
     prices: SubscriptionPrices,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserSnapshot = Depends(get_current_admin_user)
 ):
     """Update subscription prices (admin only)."""
     price_settings = [
@@ -182,5 +160,6 @@ async def update_subscription_prices(
             db.add(setting)
     
     await db.commit()
+    pricing.invalidate_prices()
     
     return prices
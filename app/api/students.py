@@ -1,65 +1,103 @@
 """Students API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, any_
+from sqlalchemy import select, func, or_, case, delete
 from typing import List, Optional
 import uuid
-from datetime import date, timedelta
-from decimal import Decimal
+from datetime import date
 
 from app.database import get_db
-from app.models.user import User
 from app.models.student import Student
 from app.models.group import Group, AgeGroup
 from app.models.subscription import Subscription, SubscriptionType
-from app.schemas.student import StudentCreate, StudentUpdate, StudentResponse, StudentWithStats
-from app.core.security import get_current_user
-from app.core.permissions import check_student_access, check_group_access
+from app.models.attendance_rollup import AttendanceMonthlyRollup
+from app.models.tournament import TournamentParticipation
+from app.models.payment import Payment
+from app.models.attendance import Attendance
+from app.schemas.student import (
+    StudentCreate,
+    StudentUpdate,
+    StudentResponse,
+    StudentWithStats,
+    StudentSearchResult,
+    StudentProfile,
+    StudentProfileStatistics
+)
 from app.constants import (
-    DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE,
-    DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    DEFAULT_PROFILE_SECTION_LIMIT,
+    MAX_PROFILE_EXTRA_SESSIONS,
 )
+from app.core.security import get_current_user
+from app.core.user_cache import UserSnapshot
+from app.core.pricing import get_subscription_params
+from app.core.permissions import check_student_access, check_group_access
+from app.core.roster import group_members_filter
+from app.utils.training_calendar import count_session_dates
+from app.api.tournaments import build_student_tournament_stats
+from app.utils.pagination import keyset_after, split_page, parse_fields, dump_fields, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/api/students", tags=["students"])
 
 
-def get_subscription_params(subscription_type: SubscriptionType, age_group: AgeGroup):
-    """Get subscription parameters based on type and age group."""
-    if subscription_type == SubscriptionType.EIGHT_SESSIONS:
-        total_sessions = 8
-        if age_group == AgeGroup.SENIOR:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE))
-        else:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE))
-    else:  # TWELVE_SESSIONS
-        total_sessions = 12
-        if age_group == AgeGroup.SENIOR:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE))
-        else:
-            price = Decimal(str(DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE))
-    
-    # Expiry date: 2 months from start date
-    expiry_date = date.today() + timedelta(days=60)
-    
-    return {
-        'total_sessions': total_sessions,
-        'remaining_sessions': total_sessions,
-        'price': price,
-        'expiry_date': expiry_date
-    }
+# Поля ответа, которых нет в таблице students
+STUDENT_COMPUTED_FIELDS = {'group_name', 'subscription_type'}
 
 
 @router.get("", response_model=List[StudentResponse])
 async def get_students(
+    response: Response,
     group_id: Optional[uuid.UUID] = Query(None),
     is_active: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated StudentResponse fields, e.g. id,full_name"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Get all students for the current trainer with optional filters."""
-    query = select(Student)
+    """Get all students for the current trainer with optional filters.
+    
+    Ordered by (full_name, id). Pagination is opt-in: with `limit` or `cursor`
+    at most `limit` students are returned and the next page cursor is sent in
+    the X-Next-Cursor header. `fields` limits the selected and returned attributes.
+    """
+    try:
+        selected = parse_fields(fields, StudentResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    columns = selected or list(StudentResponse.model_fields)
+    
+    # id и full_name нужны всегда - это ключ сортировки
+    expressions = {'id': Student.id, 'full_name': Student.full_name}
+    for name in columns:
+        if name not in STUDENT_COMPUTED_FIELDS:
+            expressions[name] = getattr(Student, name)
+    
+    if 'group_name' in columns:
+        expressions['group_name'] = Group.name
+    
+    if 'subscription_type' in columns:
+        # Активный абонемент (самый свежий) для каждого студента
+        active_subscription = (
+            select(Subscription.student_id, Subscription.subscription_type)
+            .where(Subscription.is_active == True)
+            .distinct(Subscription.student_id)
+            .order_by(Subscription.student_id, Subscription.start_date.desc())
+            .subquery()
+        )
+        expressions['subscription_type'] = active_subscription.c.subscription_type
+    
+    query = select(*[expression.label(name) for name, expression in expressions.items()]).select_from(Student)
+    if 'group_name' in columns:
+        query = query.outerjoin(Group, Group.id == Student.group_id)
+    if 'subscription_type' in columns:
+        query = query.outerjoin(active_subscription, active_subscription.c.student_id == Student.id)
     
     # Filter by trainer (unless admin)
     if not current_user.is_admin:
@@ -68,54 +106,104 @@ async def get_students(
     # Apply filters
     if group_id is not None:
         # Include students where group_id matches OR group is in additional_group_ids
-        query = query.where(
-            or_(
-                Student.group_id == group_id,
-                group_id == any_(Student.additional_group_ids)
-            )
-        )
+        query = query.where(group_members_filter(group_id))
     
     if is_active is not None:
         query = query.where(Student.is_active == is_active)
     
-    query = query.order_by(Student.full_name)
+    paginate = cursor is not None or limit is not None
+    if cursor:
+        try:
+            query = query.where(keyset_after((Student.full_name, Student.id), cursor, (str, uuid.UUID)))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    query = query.order_by(Student.full_name, Student.id)
+    if paginate:
+        limit = limit or DEFAULT_PAGE_SIZE
+        # One extra row tells whether there is a next page
+        query = query.limit(limit + 1)
     
     result = await db.execute(query)
-    students = result.scalars().all()
+    rows = result.mappings().all()
     
-    # Добавляем subscription_type и group_name для каждого студента
-    students_list = []
-    for student in students:
-        # Получаем активный абонемент (самый свежий)
-        sub_query = select(Subscription).where(
-            Subscription.student_id == student.id,
-            Subscription.is_active == True
-        ).order_by(Subscription.start_date.desc())
-        sub_result = await db.execute(sub_query)
-        active_sub = sub_result.scalars().first()
-        
-        # Получаем название группы
-        group_query = select(Group).where(Group.id == student.group_id)
-        group_result = await db.execute(group_query)
-        group = group_result.scalar_one_or_none()
-        
-        # Создаем response объект
-        student_response = StudentResponse.model_validate(student)
-        if active_sub:
-            student_response.subscription_type = active_sub.subscription_type.value
-        if group:
-            student_response.group_name = group.name
-        
-        students_list.append(student_response)
+    next_cursor = None
+    if paginate:
+        rows, next_cursor = split_page(rows, limit, lambda row: (row['full_name'], row['id']))
+    
+    students = []
+    for row in rows:
+        student = dict(row)
+        if student.get('subscription_type'):
+            student['subscription_type'] = student['subscription_type'].value
+        students.append(student)
+    
+    if selected is None:
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return [StudentResponse(**student) for student in students]
+    
+    # Sparse fieldset: только запрошенные поля, но через ту же модель ответа
+    return JSONResponse(
+        content=[dump_fields(StudentResponse, student, selected) for student in students],
+        headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    )
+
+
+@router.get("/search", response_model=List[StudentSearchResult])
+async def search_students(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Search students by name, phone or email (for as-you-type lookups).
+    
+    Uses the pg_trgm indexes; results are ordered by relevance.
+    """
+    term = q.strip()
+    # Экранируем спецсимволы LIKE
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = f"%{escaped}%"
+    
+    rank = func.greatest(
+        func.similarity(Student.full_name, term),
+        func.similarity(func.coalesce(Student.phone, ''), term),
+        func.similarity(func.coalesce(Student.email, ''), term)
+    )
+    
+    query = select(Student).where(
+        or_(
+            Student.full_name.ilike(pattern, escape="\\"),
+            Student.phone.ilike(pattern, escape="\\"),
+            Student.email.ilike(pattern, escape="\\"),
+            Student.full_name.op('%')(term)
+        )
+    )
+    
+    if not current_user.is_admin:
+        query = query.where(Student.trainer_id == current_user.id)
+    
+    query = query.order_by(
+        # Совпадение с начала имени выше всего
+        case((Student.full_name.ilike(f"{escaped}%", escape="\\"), 0), else_=1),
+        rank.desc(),
+        Student.full_name,
+        Student.id
+    ).limit(limit)
     
-    return students_list
+    result = await db.execute(query)
+    return result.scalars().all()
 
 
 @router.post("", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
 async def create_student(
     student_data: StudentCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Create a new student."""
     # Verify group access
@@ -143,7 +231,8 @@ async def create_student(
         group = group_result.scalar_one()
         
         # Получаем параметры абонемента
-        subscription_params = get_subscription_params(
+        subscription_params = await get_subscription_params(
+            db,
             SubscriptionType(subscription_type),
             group.age_group
         )
@@ -179,7 +268,7 @@ async def create_student(
 async def get_student(
     student_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get a specific student."""
     student = await check_student_access(student_id, current_user, db)
@@ -191,7 +280,7 @@ async def update_student(
     student_id: uuid.UUID,
     student_data: StudentUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Update a student."""
     student = await check_student_access(student_id, current_user, db)
@@ -229,7 +318,8 @@ async def update_student(
         group = group_result.scalar_one_or_none()
         
         # Получаем параметры абонемента
-        sub_params = get_subscription_params(
+        sub_params = await get_subscription_params(
+            db,
             SubscriptionType(subscription_type),
             group.age_group if group else AgeGroup.SENIOR
         )
@@ -268,12 +358,12 @@ async def update_student(
 async def delete_student(
     student_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Delete a student."""
-    student = await check_student_access(student_id, current_user, db)
+    """Delete a student with their history (removed by ON DELETE CASCADE)."""
+    await check_student_access(student_id, current_user, db)
     
-    await db.delete(student)
+    await db.execute(delete(Student).where(Student.id == student_id))
     await db.commit()
     
     return None
@@ -283,15 +373,29 @@ async def delete_student(
 async def get_student_statistics(
     student_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get student with statistics."""
     student = await check_student_access(student_id, current_user, db)
     
-    # Get attendance count
+    return StudentWithStats(
+        **student.__dict__,
+        **await _get_student_totals(db, student)
+    )
+
+
+async def _get_student_totals(db: AsyncSession, student: Student) -> dict:
+    """Attendance and tournament totals of a student."""
+    student_id = student.id
+    
+    # Get attendance count from the monthly rollup
     attendance_result = await db.execute(
-        select(func.count(Attendance.id))
-        .where(Attendance.student_id == student_id)
+        select(func.sum(
+            AttendanceMonthlyRollup.present_count
+            + AttendanceMonthlyRollup.absent_count
+            + AttendanceMonthlyRollup.transferred_count
+        ))
+        .where(AttendanceMonthlyRollup.student_id == student_id)
     )
     total_attendances = attendance_result.scalar() or 0
     
@@ -304,12 +408,137 @@ async def get_student_statistics(
         .where(TournamentParticipation.student_id == student_id)
     )
     tournament_stats = tournament_result.first()
-    total_tournaments = tournament_stats[0] or 0
-    total_wins = tournament_stats[1] or 0
     
-    return StudentWithStats(
-        **student.__dict__,
-        total_attendances=total_attendances,
-        total_tournaments=total_tournaments,
-        total_wins=total_wins
+    # Тренировки основной группы с даты регистрации по сегодня
+    group_result = await db.execute(
+        select(Group.schedule_type, Group.schedule).where(Group.id == student.group_id)
+    )
+    group = group_result.first()
+    expected_sessions = (
+        count_session_dates(group, student.registration_date, date.today()) if group else 0
+    )
+    
+    return {
+        'total_attendances': total_attendances,
+        'expected_sessions': expected_sessions,
+        'total_tournaments': tournament_stats[0] or 0,
+        'total_wins': tournament_stats[1] or 0,
+    }
+
+
+# Разделы карточки ученика, доступные через include=
+PROFILE_SECTIONS = ('statistics', 'subscriptions', 'payments', 'attendance', 'tournaments')
+
+# Ограничивает число соединений пула, занятых разделами профилей одновременно
+_profile_sessions = asyncio.Semaphore(MAX_PROFILE_EXTRA_SESSIONS)
+
+
+@router.get("/{student_id}/profile", response_model=StudentProfile)
+async def get_student_profile(
+    student_id: uuid.UUID,
+    include: Optional[str] = Query(None, description="Comma-separated sections: " + ",".join(PROFILE_SECTIONS)),
+    limit: int = Query(DEFAULT_PROFILE_SECTION_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Get everything shown on the student card in one request.
+    
+    Access is checked once; the requested sections are loaded concurrently
+    in extra sessions while MAX_PROFILE_EXTRA_SESSIONS allows, the rest one
+    after another on the request session. List sections return at most
+    `limit` newest records.
+    """
+    try:
+        sections = parse_fields(include, PROFILE_SECTIONS) or list(PROFILE_SECTIONS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    student = await check_student_access(student_id, current_user, db)
+    
+    # Группа и активный абонемент - как в списке учеников
+    details_result = await db.execute(
+        select(
+            select(Group.name).where(Group.id == student.group_id).scalar_subquery(),
+            select(Subscription.subscription_type)
+            .where(Subscription.student_id == student_id, Subscription.is_active == True)
+            .order_by(Subscription.start_date.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+    )
+    group_name, subscription_type = details_result.one()
+    student_response = StudentResponse.model_validate(student)
+    student_response.group_name = group_name
+    if subscription_type:
+        student_response.subscription_type = subscription_type.value
+    
+    async def load_statistics(session: AsyncSession):
+        return StudentProfileStatistics(**await _get_student_totals(session, student))
+    
+    async def load_subscriptions(session: AsyncSession):
+        result = await session.execute(
+            select(Subscription)
+            .where(Subscription.student_id == student_id)
+            .order_by(Subscription.created_at.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+    
+    async def load_payments(session: AsyncSession):
+        result = await session.execute(
+            select(Payment)
+            .where(Payment.student_id == student_id)
+            .order_by(Payment.payment_date.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+    
+    async def load_attendance(session: AsyncSession):
+        result = await session.execute(
+            select(Attendance)
+            .where(Attendance.student_id == student_id)
+            .order_by(Attendance.session_date.desc(), Attendance.id.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+    
+    async def load_tournaments(session: AsyncSession):
+        return await build_student_tournament_stats(session, student, limit)
+    
+    loaders = {
+        'statistics': load_statistics,
+        'subscriptions': load_subscriptions,
+        'payments': load_payments,
+        'attendance': load_attendance,
+        'tournaments': load_tournaments,
+    }
+    
+    # AsyncSession нельзя использовать конкурентно: параллельный раздел
+    # получает свою сессию, если есть свободный слот (без ожидания)
+    parallel_sections = []
+    for section in sections[1:]:
+        if _profile_sessions.locked():
+            break
+        await _profile_sessions.acquire()
+        parallel_sections.append(section)
+    local_sections = [section for section in sections if section not in parallel_sections]
+    
+    async def run_parallel(section: str):
+        try:
+            async with AsyncSession(db.bind, expire_on_commit=False) as session:
+                return await loaders[section](session)
+        finally:
+            _profile_sessions.release()
+    
+    async def run_local():
+        return [await loaders[section](db) for section in local_sections]
+    
+    local_results, *parallel_results = await asyncio.gather(
+        run_local(),
+        *(run_parallel(section) for section in parallel_sections)
     )
+    
+    results = dict(zip(local_sections, local_results))
+    results.update(zip(parallel_sections, parallel_results))
+    
+    return StudentProfile(student=student_response, **results)
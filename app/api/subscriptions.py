@@ -1,22 +1,28 @@
 """Subscriptions API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 from datetime import timedelta
 import uuid
 
 from app.database import get_db
-from app.models.user import User
 from app.models.subscription import Subscription, SubscriptionType
+from app.models.student import Student
+from app.models.group import Group
+from app.constants import MAX_PAGE_SIZE
 from app.schemas.subscription import (
     SubscriptionCreate,
     SubscriptionUpdate,
     SubscriptionResponse,
-    SubscriptionUsage
+    SubscriptionUsage,
+    StudentSubscriptionUsage
 )
 from app.core.security import get_current_user
-from app.core.permissions import check_student_access
+from app.core.user_cache import UserSnapshot
+from app.core.permissions import check_student_access, get_student_resource, student_scope_filter
+from app.core.roster import group_members_filter
+from app.utils.training_calendar import count_session_dates
 
 router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
 
@@ -25,7 +31,7 @@ router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
 async def create_subscription(
     subscription_data: SubscriptionCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Create a new subscription for a student."""
     # Verify student access
@@ -58,23 +64,79 @@ async def create_subscription(
     return new_subscription
 
 
+@router.get("/usage", response_model=List[StudentSubscriptionUsage])
+async def get_subscriptions_usage(
+    ids: Optional[List[uuid.UUID]] = Query(None, max_length=MAX_PAGE_SIZE),
+    group_id: Optional[uuid.UUID] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Get usage of many subscriptions at once.
+    
+    Either by subscription `ids`, or the active subscriptions of a group's
+    students (`group_id`). Subscriptions of other trainers' students are
+    silently skipped.
+    """
+    if not ids and group_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Specify ids or group_id"
+        )
+    
+    query = select(
+        Subscription.id,
+        Subscription.student_id,
+        Subscription.total_sessions,
+        Subscription.remaining_sessions,
+        Subscription.is_active,
+        Subscription.start_date,
+        Subscription.expiry_date,
+        Group.schedule_type,
+        Group.schedule
+    ).join(Student, Subscription.student_id == Student.id).join(Group, Student.group_id == Group.id)
+    
+    if ids:
+        query = query.where(Subscription.id.in_(ids))
+    if group_id is not None:
+        query = query.where(group_members_filter(group_id), Subscription.is_active == True)
+    
+    # Filter by trainer (unless admin)
+    if not current_user.is_admin:
+        query = query.where(Student.trainer_id == current_user.id)
+    
+    result = await db.execute(query.order_by(Student.full_name, Subscription.created_at.desc()))
+    
+    return [
+        StudentSubscriptionUsage(
+            **_build_usage(row),
+            student_id=row.student_id,
+            is_active=row.is_active,
+            expected_sessions=count_session_dates(row, row.start_date, row.expiry_date)
+        )
+        for row in result.all()
+    ]
+
+
 @router.get("/student/{student_id}", response_model=List[SubscriptionResponse])
 async def get_student_subscriptions(
     student_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get all subscriptions for a student."""
-    # Verify student access
-    await check_student_access(student_id, current_user, db)
-    
     result = await db.execute(
         select(Subscription)
-        .where(Subscription.student_id == student_id)
+        .where(
+            Subscription.student_id == student_id,
+            student_scope_filter(Subscription.student_id, current_user)
+        )
         .order_by(Subscription.created_at.desc())
     )
     subscriptions = result.scalars().all()
     
+    if not subscriptions:
+        await check_student_access(student_id, current_user, db)
+    
     return subscriptions
 
 
@@ -83,20 +145,13 @@ async def update_subscription(
     subscription_id: uuid.UUID,
     subscription_data: SubscriptionUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Update a subscription."""
-    result = await db.execute(select(Subscription).where(Subscription.id == subscription_id))
-    subscription = result.scalar_one_or_none()
-    
-    if not subscription:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Subscription not found"
-        )
-    
-    # Verify student access
-    await check_student_access(subscription.student_id, current_user, db)
+    # Access is checked through the student in the same query
+    subscription = await get_student_resource(
+        Subscription, subscription_id, current_user, db, "Subscription not found"
+    )
     
     # Update fields
     update_data = subscription_data.model_dump(exclude_unset=True)
@@ -113,51 +168,42 @@ async def update_subscription(
 async def get_subscription_usage(
     subscription_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get subscription usage statistics."""
-    result = await db.execute(select(Subscription).where(Subscription.id == subscription_id))
-    subscription = result.scalar_one_or_none()
-    
-    if not subscription:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Subscription not found"
-        )
-    
-    # Verify student access
-    await check_student_access(subscription.student_id, current_user, db)
+    # Access is checked through the student in the same query
+    subscription = await get_student_resource(
+        Subscription, subscription_id, current_user, db, "Subscription not found"
+    )
     
+    return SubscriptionUsage(**_build_usage(subscription))
+
+
+def _build_usage(subscription) -> dict:
+    """Usage figures of a subscription (ORM object or row with the same attributes)."""
     used_sessions = subscription.total_sessions - subscription.remaining_sessions
     usage_percentage = (used_sessions / subscription.total_sessions * 100) if subscription.total_sessions > 0 else 0
     
-    return SubscriptionUsage(
-        subscription_id=subscription.id,
-        total_sessions=subscription.total_sessions,
-        remaining_sessions=subscription.remaining_sessions,
-        used_sessions=used_sessions,
-        usage_percentage=round(usage_percentage, 2)
-    )
+    return {
+        'subscription_id': subscription.id,
+        'total_sessions': subscription.total_sessions,
+        'remaining_sessions': subscription.remaining_sessions,
+        'used_sessions': used_sessions,
+        'usage_percentage': round(usage_percentage, 2),
+    }
 
 
 @router.delete("/{subscription_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_subscription(
     subscription_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Delete a subscription."""
-    result = await db.execute(select(Subscription).where(Subscription.id == subscription_id))
-    subscription = result.scalar_one_or_none()
-    
-    if not subscription:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Subscription not found"
-        )
-    
-    # Verify student access
-    await check_student_access(subscription.student_id, current_user, db)
+    # Access is checked through the student in the same query
+    subscription = await get_student_resource(
+        Subscription, subscription_id, current_user, db, "Subscription not found"
+    )
     
     await db.delete(subscription)
     await db.commit()
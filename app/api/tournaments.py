@@ -2,11 +2,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from typing import List
+from typing import List, Optional
 import uuid
 
 from app.database import get_db
-from app.models.user import User
 from app.models.tournament import Tournament, TournamentParticipation
 from app.models.student import Student
 from app.schemas.tournament import (
@@ -20,7 +19,8 @@ from app.schemas.tournament import (
     StudentTournamentStats
 )
 from app.core.security import get_current_user
-from app.core.permissions import check_student_access
+from app.core.user_cache import UserSnapshot
+from app.core.permissions import check_student_access, get_student_resource
 
 router = APIRouter(prefix="/api/tournaments", tags=["tournaments"])
 
@@ -28,7 +28,7 @@ router = APIRouter(prefix="/api/tournaments", tags=["tournaments"])
 @router.get("", response_model=List[TournamentResponse])
 async def get_tournaments(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get all tournaments."""
     result = await db.execute(
@@ -43,7 +43,7 @@ async def get_tournaments(
 async def create_tournament(
     tournament_data: TournamentCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Create a new tournament."""
     new_tournament = Tournament(
@@ -62,7 +62,7 @@ async def create_tournament(
 async def get_tournament(
     tournament_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get a specific tournament."""
     result = await db.execute(select(Tournament).where(Tournament.id == tournament_id))
@@ -82,7 +82,7 @@ async def update_tournament(
     tournament_id: uuid.UUID,
     tournament_data: TournamentUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Update a tournament."""
     result = await db.execute(select(Tournament).where(Tournament.id == tournament_id))
@@ -109,7 +109,7 @@ async def update_tournament(
 async def delete_tournament(
     tournament_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Delete a tournament and all its participants."""
     result = await db.execute(select(Tournament).where(Tournament.id == tournament_id))
@@ -133,7 +133,7 @@ async def add_tournament_participant(
     tournament_id: uuid.UUID,
     participation_data: ParticipationCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Add a participant to a tournament."""
     # Verify tournament exists
@@ -179,7 +179,7 @@ async def add_tournament_participant(
 async def get_tournament_results(
     tournament_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Get all results for a tournament."""
     result = await db.execute(
@@ -209,25 +209,14 @@ async def update_tournament_participant(
     participation_id: uuid.UUID,
     participation_data: ParticipationUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Update a tournament participant."""
-    result = await db.execute(
-        select(TournamentParticipation).where(
-            TournamentParticipation.id == participation_id,
-            TournamentParticipation.tournament_id == tournament_id
-        )
+    # Access is checked through the student in the same query
+    participation = await get_student_resource(
+        TournamentParticipation, participation_id, current_user, db, "Participation not found",
+        TournamentParticipation.tournament_id == tournament_id
     )
-    participation = result.scalar_one_or_none()
-    
-    if not participation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Participation not found"
-        )
-    
-    # Verify student access
-    await check_student_access(participation.student_id, current_user, db)
     
     # Update fields
     update_data = participation_data.model_dump(exclude_unset=True)
@@ -245,25 +234,14 @@ async def delete_tournament_participant(
     tournament_id: uuid.UUID,
     participation_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """Delete a tournament participant."""
-    result = await db.execute(
-        select(TournamentParticipation).where(
-            TournamentParticipation.id == participation_id,
-            TournamentParticipation.tournament_id == tournament_id
-        )
+    # Access is checked through the student in the same query
+    participation = await get_student_resource(
+        TournamentParticipation, participation_id, current_user, db, "Participation not found",
+        TournamentParticipation.tournament_id == tournament_id
     )
-    participation = result.scalar_one_or_none()
-    
-    if not participation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Participation not found"
-        )
-    
-    # Verify student access
-    await check_student_access(participation.student_id, current_user, db)
     
     await db.delete(participation)
     await db.commit()
@@ -271,15 +249,16 @@ async def delete_tournament_participant(
     return None
 
 
-@router.get("/students/{student_id}/stats", response_model=StudentTournamentStats)
-async def get_student_tournament_statistics(
-    student_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get tournament statistics for a student."""
-    # Verify student access
-    student = await check_student_access(student_id, current_user, db)
+async def build_student_tournament_stats(
+    db: AsyncSession,
+    student: Student,
+    limit: Optional[int] = None
+) -> StudentTournamentStats:
+    """Build tournament statistics of a student (access must be checked by the caller).
+    
+    `limit` caps the number of participations returned, newest first.
+    """
+    student_id = student.id
     
     # Get aggregated stats
     stats_result = await db.execute(
@@ -303,13 +282,16 @@ async def get_student_tournament_statistics(
     win_rate = (total_wins / total_fights * 100) if total_fights > 0 else 0.0
     
     # Get all participations with details
-    participations_result = await db.execute(
+    participations_query = (
         select(TournamentParticipation, Student.full_name, Tournament.name, Tournament.tournament_date)
         .join(Student, TournamentParticipation.student_id == Student.id)
         .join(Tournament, TournamentParticipation.tournament_id == Tournament.id)
         .where(TournamentParticipation.student_id == student_id)
         .order_by(Tournament.tournament_date.desc())
     )
+    if limit is not None:
+        participations_query = participations_query.limit(limit)
+    participations_result = await db.execute(participations_query)
     
     participations = participations_result.all()
     
@@ -332,3 +314,16 @@ async def get_student_tournament_statistics(
             for participation, student_name, tournament_name, tournament_date in participations
         ]
     )
+
+
+@router.get("/students/{student_id}/stats", response_model=StudentTournamentStats)
+async def get_student_tournament_statistics(
+    student_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Get tournament statistics for a student."""
+    # Verify student access
+    student = await check_student_access(student_id, current_user, db)
+    
+    return await build_student_tournament_stats(db, student)
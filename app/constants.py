@@ -30,6 +30,16 @@ SETTING_DESC_SUBSCRIPTION_12_JUNIOR = "Стоимость абонемента 
 # ==================== PAGINATION ====================
 DEFAULT_PAGE_SIZE = 50
 MAX_PAGE_SIZE = 1000
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+DEFAULT_PROFILE_SECTION_LIMIT = 20
+# Extra DB sessions all student profile requests of one worker may hold at once
+MAX_PROFILE_EXTRA_SESSIONS = 4
+
+
+# ==================== ATTENDANCE SYNC ====================
+MAX_SYNC_BLOCKS = 200
+IDEMPOTENCY_KEY_MAX_LENGTH = 100
 
 
 # ==================== SESSION ====================
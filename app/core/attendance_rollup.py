@@ -0,0 +1,103 @@
+"""Maintenance of the monthly attendance rollup."""
+from collections import Counter
+from datetime import date
+from typing import Optional
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, case, extract, cast, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.attendance_rollup import AttendanceMonthlyRollup
+
+# Rollup counter column for each attendance status
+STATUS_COUNTERS = {
+    AttendanceStatus.PRESENT: 'present_count',
+    AttendanceStatus.ABSENT: 'absent_count',
+    AttendanceStatus.TRANSFERRED: 'transferred_count',
+}
+
+
+class RollupDeltas(Counter):
+    """Pending counter changes keyed by (group_id, student_id, year, month, counter)."""
+    
+    def track(
+        self,
+        group_id: uuid.UUID,
+        student_id: uuid.UUID,
+        session_date: date,
+        old_status: Optional[AttendanceStatus],
+        new_status: Optional[AttendanceStatus]
+    ) -> None:
+        """Record a status change of one attendance record (None means no record)."""
+        if old_status == new_status:
+            return
+        
+        key = (group_id, student_id, session_date.year, session_date.month)
+        if old_status is not None:
+            self[key + (STATUS_COUNTERS[old_status],)] -= 1
+        if new_status is not None:
+            self[key + (STATUS_COUNTERS[new_status],)] += 1
+
+
+async def apply_rollup_deltas(db: AsyncSession, deltas: RollupDeltas) -> None:
+    """Apply pending counter changes with a single upsert."""
+    rows = {}
+    for (group_id, student_id, year, month, counter), delta in deltas.items():
+        if delta == 0:
+            continue
+        row = rows.setdefault((group_id, student_id, year, month), {
+            'group_id': group_id,
+            'student_id': student_id,
+            'year': year,
+            'month': month,
+            **{counter_name: 0 for counter_name in STATUS_COUNTERS.values()}
+        })
+        row[counter] += delta
+    
+    if not rows:
+        return
+    
+    table = AttendanceMonthlyRollup.__table__
+    upsert = pg_insert(table).values(list(rows.values()))
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[table.c.group_id, table.c.student_id, table.c.year, table.c.month],
+        set_={
+            counter: table.c[counter] + upsert.excluded[counter]
+            for counter in STATUS_COUNTERS.values()
+        }
+    )
+    await db.execute(upsert)
+
+
+async def rebuild_attendance_rollup(db: AsyncSession) -> int:
+    """Recompute the whole rollup from the attendances table.
+    
+    Returns the number of rollup rows written. The caller commits.
+    """
+    year = cast(extract('year', Attendance.session_date), Integer)
+    month = cast(extract('month', Attendance.session_date), Integer)
+    
+    aggregate = (
+        select(
+            Attendance.group_id,
+            Attendance.student_id,
+            year,
+            month,
+            *[
+                func.count(case((Attendance.status == status, 1)))
+                for status in STATUS_COUNTERS
+            ]
+        )
+        .group_by(Attendance.group_id, Attendance.student_id, year, month)
+    )
+    
+    await db.execute(delete(AttendanceMonthlyRollup))
+    result = await db.execute(
+        pg_insert(AttendanceMonthlyRollup.__table__).from_select(
+            ['group_id', 'student_id', 'year', 'month', *STATUS_COUNTERS.values()],
+            aggregate
+        )
+    )
+    return result.rowcount
@@ -0,0 +1,48 @@
+"""In-process application metrics.
+
+Counters and gauges are kept in memory and can be forwarded to an external
+system by registering a hook.
+"""
+from collections import Counter
+from typing import Callable, Dict, List
+
+# Hook signature: (kind, name, value) where kind is "counter" or "gauge"
+MetricsHook = Callable[[str, str, float], None]
+
+_counters: Counter = Counter()
+_gauges: Dict[str, float] = {}
+_hooks: List[MetricsHook] = []
+
+
+def register_metrics_hook(hook: MetricsHook) -> None:
+    """Call `hook` for every recorded metric."""
+    _hooks.append(hook)
+
+
+def _notify(kind: str, name: str, value: float) -> None:
+    for hook in _hooks:
+        try:
+            hook(kind, name, value)
+        except Exception as e:
+            # Метрики не должны ломать основную работу
+            print(f"ERROR in metrics hook: {e}")
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Increase a counter."""
+    _counters[name] += value
+    _notify("counter", name, value)
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Set a gauge to the current value."""
+    _gauges[name] = value
+    _notify("gauge", name, value)
+
+
+def get_metrics() -> dict:
+    """Snapshot of all counters and gauges."""
+    return {
+        'counters': dict(_counters),
+        'gauges': dict(_gauges),
+    }
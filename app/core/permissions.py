@@ -1,33 +1,80 @@
-"""Permission checking utilities."""
+"""Permission checking utilities.
+
+Access is checked in the same statement that loads the data: the builders
+below add the trainer_id predicate to the query. A second query is only made
+on the miss path, to tell "not found" (404) from "forbidden" (403).
+"""
+from typing import NoReturn, Type
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, true, Select
 import uuid
 
-from app.models.user import User
+from app.core.user_cache import UserSnapshot
 from app.models.group import Group
 from app.models.student import Student
 
 
+def scope_to_trainer(query: Select, trainer_column, user: UserSnapshot) -> Select:
+    """Restrict a query to rows owned by the user (admins see everything)."""
+    if user.is_admin:
+        return query
+    return query.where(trainer_column == user.id)
+
+
+def group_scope_filter(group_id_column, user: UserSnapshot):
+    """Predicate keeping rows whose group belongs to the user."""
+    if user.is_admin:
+        return true()
+    return select(Group.id).where(Group.id == group_id_column, Group.trainer_id == user.id).exists()
+
+
+def student_scope_filter(student_id_column, user: UserSnapshot):
+    """Predicate keeping rows whose student belongs to the user."""
+    if user.is_admin:
+        return true()
+    return select(Student.id).where(Student.id == student_id_column, Student.trainer_id == user.id).exists()
+
+
+async def raise_not_found_or_forbidden(
+    db: AsyncSession,
+    model: Type,
+    resource_id: uuid.UUID,
+    user: UserSnapshot,
+    not_found_detail: str,
+    forbidden_detail: str,
+    *criteria
+) -> NoReturn:
+    """Raise 404 or 403 after a scoped query returned nothing."""
+    if not user.is_admin:
+        exists = await db.scalar(select(model.id).where(model.id == resource_id, *criteria))
+        if exists is not None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=forbidden_detail
+            )
+    
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=not_found_detail
+    )
+
+
 async def check_group_access(
     group_id: uuid.UUID,
-    user: User,
+    user: UserSnapshot,
     db: AsyncSession
 ) -> Group:
     """Check if user has access to a group."""
-    result = await db.execute(select(Group).where(Group.id == group_id))
+    result = await db.execute(
+        scope_to_trainer(select(Group).where(Group.id == group_id), Group.trainer_id, user)
+    )
     group = result.scalar_one_or_none()
     
     if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
-    
-    if not user.is_admin and group.trainer_id != user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this group"
+        await raise_not_found_or_forbidden(
+            db, Group, group_id, user,
+            "Group not found", "Not authorized to access this group"
         )
     
     return group
@@ -35,29 +82,81 @@ async def check_group_access(
 
 async def check_student_access(
     student_id: uuid.UUID,
-    user: User,
+    user: UserSnapshot,
     db: AsyncSession
 ) -> Student:
     """Check if user has access to a student."""
-    result = await db.execute(select(Student).where(Student.id == student_id))
+    result = await db.execute(
+        scope_to_trainer(select(Student).where(Student.id == student_id), Student.trainer_id, user)
+    )
     student = result.scalar_one_or_none()
     
     if not student:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Student not found"
+        await raise_not_found_or_forbidden(
+            db, Student, student_id, user,
+            "Student not found", "Not authorized to access this student"
         )
     
-    if not user.is_admin and student.trainer_id != user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this student"
+    return student
+
+
+async def get_student_resource(
+    model: Type,
+    resource_id: uuid.UUID,
+    user: UserSnapshot,
+    db: AsyncSession,
+    not_found_detail: str,
+    *criteria
+):
+    """Load a row belonging to a student (payment, subscription, ...) checking access in the same query."""
+    query = select(model).where(model.id == resource_id, *criteria)
+    if not user.is_admin:
+        query = query.join(Student, model.student_id == Student.id).where(Student.trainer_id == user.id)
+    
+    result = await db.execute(query)
+    resource = result.scalar_one_or_none()
+    
+    if not resource:
+        await raise_not_found_or_forbidden(
+            db, model, resource_id, user,
+            not_found_detail, "Not authorized to access this student",
+            *criteria
         )
     
-    return student
+    return resource
+
+
+async def get_group_resource(
+    model: Type,
+    resource_id: uuid.UUID,
+    user: UserSnapshot,
+    db: AsyncSession,
+    not_found_detail: str,
+    for_update: bool = False
+):
+    """Load a row belonging to a group (attendance) checking access in the same query.
+    
+    With for_update the row is locked (SELECT ... FOR UPDATE) until commit.
+    """
+    query = select(model).where(model.id == resource_id)
+    if not user.is_admin:
+        query = query.join(Group, model.group_id == Group.id).where(Group.trainer_id == user.id)
+    if for_update:
+        query = query.with_for_update(of=model).execution_options(populate_existing=True)
+    
+    result = await db.execute(query)
+    resource = result.scalar_one_or_none()
+    
+    if not resource:
+        await raise_not_found_or_forbidden(
+            db, model, resource_id, user,
+            not_found_detail, "Not authorized to access this group"
+        )
+    
+    return resource
 
 
-def verify_resource_ownership(resource_trainer_id: uuid.UUID, user: User) -> None:
+def verify_resource_ownership(resource_trainer_id: uuid.UUID, user: UserSnapshot) -> None:
     """Verify that user owns a resource or is admin."""
     if not user.is_admin and resource_trainer_id != user.id:
         raise HTTPException(
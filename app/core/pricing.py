@@ -0,0 +1,128 @@
+"""Subscription pricing backed by the Settings table with an in-process cache."""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.settings import Settings
+from app.models.group import AgeGroup
+from app.models.subscription import SubscriptionType
+from app.constants import (
+    DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE,
+    DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE,
+    DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE,
+    DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE,
+    SETTING_KEY_SUBSCRIPTION_8_SENIOR,
+    SETTING_KEY_SUBSCRIPTION_8_JUNIOR,
+    SETTING_KEY_SUBSCRIPTION_12_SENIOR,
+    SETTING_KEY_SUBSCRIPTION_12_JUNIOR,
+)
+
+# Default price for every price setting key
+DEFAULT_PRICES = {
+    SETTING_KEY_SUBSCRIPTION_8_SENIOR: DEFAULT_SUBSCRIPTION_8_SENIOR_PRICE,
+    SETTING_KEY_SUBSCRIPTION_8_JUNIOR: DEFAULT_SUBSCRIPTION_8_JUNIOR_PRICE,
+    SETTING_KEY_SUBSCRIPTION_12_SENIOR: DEFAULT_SUBSCRIPTION_12_SENIOR_PRICE,
+    SETTING_KEY_SUBSCRIPTION_12_JUNIOR: DEFAULT_SUBSCRIPTION_12_JUNIOR_PRICE,
+}
+
+# Cached prices. The version is bumped on invalidation so that a load which
+# started before a price update does not store stale values.
+_cache: Dict[str, object] = {
+    "prices": None,
+    "loaded_at": 0.0,
+    "version": 0,
+}
+
+
+def get_price_key(subscription_type: SubscriptionType, age_group: AgeGroup) -> str:
+    """Get settings key of the price for a subscription type and age group."""
+    if subscription_type == SubscriptionType.EIGHT_SESSIONS:
+        if age_group == AgeGroup.SENIOR:
+            return SETTING_KEY_SUBSCRIPTION_8_SENIOR
+        return SETTING_KEY_SUBSCRIPTION_8_JUNIOR
+    # TWELVE_SESSIONS
+    if age_group == AgeGroup.SENIOR:
+        return SETTING_KEY_SUBSCRIPTION_12_SENIOR
+    return SETTING_KEY_SUBSCRIPTION_12_JUNIOR
+
+
+def get_sessions_count(subscription_type: SubscriptionType) -> int:
+    """Get number of sessions included in a subscription type."""
+    return 8 if subscription_type == SubscriptionType.EIGHT_SESSIONS else 12
+
+
+def invalidate_prices() -> None:
+    """Drop cached prices. Call after any change of a price setting."""
+    _cache["version"] += 1
+    _cache["prices"] = None
+
+
+def _cached_prices() -> Optional[Dict[str, int]]:
+    """Return cached prices if they are still fresh."""
+    if _cache["prices"] is None:
+        return None
+    if time.monotonic() - _cache["loaded_at"] > settings.PRICE_CACHE_TTL_SECONDS:
+        return None
+    return _cache["prices"]
+
+
+async def get_subscription_prices(db: AsyncSession) -> Dict[str, int]:
+    """Get all subscription prices keyed by settings key.
+    
+    Served from the cache; the Settings table is read only on a miss. The
+    TTL bounds staleness across workers, which don't share invalidations.
+    """
+    prices = _cached_prices()
+    if prices is not None:
+        return prices
+    
+    version = _cache["version"]
+    result = await db.execute(
+        select(Settings.key, Settings.value).where(Settings.key.in_(list(DEFAULT_PRICES)))
+    )
+    stored = dict(result.all())
+    prices = {
+        key: int(stored[key]) if key in stored else default
+        for key, default in DEFAULT_PRICES.items()
+    }
+    
+    if _cache["version"] == version:
+        _cache["prices"] = prices
+        _cache["loaded_at"] = time.monotonic()
+    
+    return prices
+
+
+async def get_subscription_price(
+    db: AsyncSession,
+    subscription_type: SubscriptionType,
+    age_group: AgeGroup
+) -> Decimal:
+    """Get standard price of a subscription type for an age group."""
+    prices = await get_subscription_prices(db)
+    return Decimal(str(prices[get_price_key(subscription_type, age_group)]))
+
+
+async def get_subscription_params(
+    db: AsyncSession,
+    subscription_type: SubscriptionType,
+    age_group: AgeGroup
+) -> dict:
+    """Get subscription parameters based on type and age group."""
+    total_sessions = get_sessions_count(subscription_type)
+    price = await get_subscription_price(db, subscription_type, age_group)
+    
+    # Expiry date: 2 months from start date
+    expiry_date = date.today() + timedelta(days=60)
+    
+    return {
+        'total_sessions': total_sessions,
+        'remaining_sessions': total_sessions,
+        'price': price,
+        'expiry_date': expiry_date
+    }
@@ -0,0 +1,130 @@
+"""Refresh token issuing, rotation and revocation.
+
+Refresh tokens are random opaque strings; the database keeps only their
+HMAC-SHA256, so a refresh is a hash and an indexed lookup instead of a
+bcrypt check. Every refresh token is single use: exchanging it revokes it
+and issues a new one.
+"""
+import hashlib
+import hmac
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, or_
+
+from app.config import settings
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.core.user_cache import invalidate_user_on_commit
+
+
+def hash_refresh_token(token: str) -> str:
+    """HMAC of a refresh token as stored in the database."""
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: uuid.UUID) -> str:
+    """Create a refresh token for a user; the caller commits."""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+
+async def consume_refresh_token(db: AsyncSession, token: str) -> Optional[uuid.UUID]:
+    """Revoke a valid refresh token and return its user id, or None if invalid.
+    
+    The token is claimed with a single conditional UPDATE, so concurrent
+    requests cannot both use it. Reuse of an already rotated token revokes
+    all tokens of the user. The caller commits.
+    """
+    now = datetime.utcnow()
+    token_hash = hash_refresh_token(token)
+    
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now
+        )
+        .values(revoked_at=now)
+        .returning(RefreshToken.user_id)
+    )
+    user_id = result.scalar_one_or_none()
+    if user_id is not None:
+        return user_id
+    
+    # Повторное использование уже замененного токена - вероятная утечка
+    reused = await db.execute(
+        select(RefreshToken.user_id).where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at.is_not(None)
+        )
+    )
+    reused_user_id = reused.scalar_one_or_none()
+    if reused_user_id is not None:
+        print(f"WARNING: Reuse of revoked refresh token for user {reused_user_id}, revoking all tokens")
+        await revoke_user_tokens(db, reused_user_id)
+    
+    return None
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> None:
+    """Revoke one refresh token (logout); the caller commits."""
+    await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(token),
+            RefreshToken.revoked_at.is_(None)
+        )
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: uuid.UUID) -> None:
+    """Revoke all refresh tokens and previously issued access tokens of a user.
+    
+    The caller commits; the cached user snapshot is dropped after the commit.
+    """
+    now = datetime.utcnow()
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(tokens_revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    # Массовый UPDATE не вызывает событий ORM - сбрасываем кэш явно,
+    # но только после commit, иначе в кэш снова попадет старая строка
+    invalidate_user_on_commit(db.sync_session, user_id)
+
+
+async def purge_refresh_tokens(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Delete expired refresh tokens and tokens revoked long ago.
+    
+    Recently revoked tokens are kept to detect reuse. Returns the number of
+    deleted rows; the caller commits.
+    """
+    now = now or datetime.utcnow()
+    revoked_before = now - timedelta(days=settings.REFRESH_TOKEN_REVOKED_RETENTION_DAYS)
+    
+    result = await db.execute(
+        delete(RefreshToken).where(
+            or_(
+                RefreshToken.expires_at < now,
+                RefreshToken.revoked_at < revoked_before
+            )
+        )
+    )
+    return result.rowcount
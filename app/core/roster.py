@@ -0,0 +1,37 @@
+"""Group roster queries.
+
+A student belongs to a group through Student.group_id or through
+Student.additional_group_ids. Membership is checked with array containment
+(@>, &&) so both parts can use an index (btree on group_id, GIN on
+additional_group_ids).
+"""
+import uuid
+from typing import Sequence
+from sqlalchemy import select, or_
+
+from app.models.student import Student
+
+
+def group_members_filter(group_id: uuid.UUID):
+    """Condition matching students of a group (primary or additional)."""
+    return or_(
+        Student.group_id == group_id,
+        Student.additional_group_ids.contains([group_id])
+    )
+
+
+def groups_members_filter(group_ids: Sequence[uuid.UUID]):
+    """Condition matching students of any of the groups (primary or additional)."""
+    group_ids = list(group_ids)
+    return or_(
+        Student.group_id.in_(group_ids),
+        Student.additional_group_ids.overlap(group_ids)
+    )
+
+
+def group_roster_query(group_id: uuid.UUID, active_only: bool = True):
+    """Select students of a group ordered by name."""
+    query = select(Student).where(group_members_filter(group_id))
+    if active_only:
+        query = query.where(Student.is_active == True)
+    return query.order_by(Student.full_name)
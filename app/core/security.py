@@ -1,4 +1,7 @@
 """Security utilities for authentication and authorization."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -13,11 +16,26 @@ from app.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import TokenData
+from app.core.user_cache import (
+    UserSnapshot,
+    cache_user_snapshot,
+    token_cache,
+    user_cache,
+    user_cache_generation,
+)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
+# bcrypt блокирует поток на 100-300 мс, поэтому в async-коде он выполняется
+# в отдельном ограниченном пуле потоков
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash."""
     return bcrypt.checkpw(
@@ -33,11 +51,33 @@ def get_password_hash(password: str) -> str:
     if len(password_bytes) > 72:
         password_bytes = password_bytes[:72]
     
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the password thread pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the password thread pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash was made with a different work factor than configured."""
+    try:
+        # Формат bcrypt: $2b$<cost>$<salt+hash>
+        rounds = int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.BCRYPT_ROUNDS
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
@@ -46,7 +86,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # iat с долями секунды: токен, выпущенный в ту же секунду до отзыва, тоже отзывается
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -54,28 +95,52 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token."""
+) -> UserSnapshot:
+    """Get current authenticated user from JWT token.
+    
+    Returns an immutable snapshot; validated tokens and users are cached
+    for USER_CACHE_TTL_SECONDS.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            subject: str = payload.get("sub")
+            if subject is None:
+                raise credentials_exception
+            token_data = TokenData(user_id=uuid.UUID(subject))
+        except (JWTError, ValueError):
             raise credentials_exception
-        token_data = TokenData(user_id=uuid.UUID(user_id))
-    except JWTError:
-        raise credentials_exception
-    
-    # Get user from database
-    result = await db.execute(select(User).where(User.id == token_data.user_id))
-    user = result.scalar_one_or_none()
+        
+        claims = (token_data.user_id, payload.get("iat", 0))
+        # Не держим токен в кэше дольше, чем он действителен
+        expires_in = payload.get("exp", 0) - time.time()
+        if expires_in > 0:
+            token_cache.set(token, claims, expires_in)
     
+    user_id, issued_at = claims
+    user = user_cache.get(user_id)
     if user is None:
+        generation = user_cache_generation()
+        
+        # Get user from database
+        result = await db.execute(select(User).where(User.id == user_id))
+        db_user = result.scalar_one_or_none()
+        
+        if db_user is None:
+            raise credentials_exception
+        
+        user = UserSnapshot.from_user(db_user)
+        cache_user_snapshot(user, generation)
+    
+    # Токены, выпущенные до отзыва, недействительны
+    if not user.accepts_token_issued_at(issued_at):
         raise credentials_exception
     
     if not user.is_active:
@@ -85,8 +150,8 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> UserSnapshot:
     """Get current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -94,8 +159,8 @@ async def get_current_active_user(
 
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> UserSnapshot:
     """Get current admin user."""
     if not current_user.is_admin:
         raise HTTPException(
@@ -0,0 +1,154 @@
+"""Periodic deactivation of expired and used-up subscriptions.
+
+The same run also purges stale refresh tokens and old attendance sync keys.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from sqlalchemy import select, update, delete, func, or_
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models.subscription import Subscription
+from app.models.attendance_sync import AttendanceSyncKey
+from app.core import metrics
+from app.core.refresh_tokens import purge_refresh_tokens
+
+# Ключ advisory lock: свипер выполняет только один воркер
+SWEEPER_LOCK_KEY = 0x53554253  # "SUBS"
+
+
+async def deactivate_stale_subscriptions(db: AsyncSession, today: Optional[date] = None) -> dict:
+    """Deactivate active subscriptions that are expired or have no sessions left.
+    
+    One UPDATE statement; the caller commits. Returns counts by reason.
+    """
+    today = today or date.today()
+    
+    result = await db.execute(
+        update(Subscription)
+        .where(
+            Subscription.is_active == True,
+            or_(
+                Subscription.expiry_date < today,
+                Subscription.remaining_sessions <= 0
+            )
+        )
+        .values(is_active=False)
+        .returning(Subscription.expiry_date < today)
+    )
+    expired_flags = result.scalars().all()
+    
+    expired = sum(1 for is_expired in expired_flags if is_expired)
+    return {
+        'expired': expired,
+        'exhausted': len(expired_flags) - expired,
+    }
+
+
+async def purge_attendance_sync_keys(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Delete idempotency keys older than ATTENDANCE_SYNC_KEY_RETENTION_DAYS.
+    
+    Returns the number of deleted keys; the caller commits.
+    """
+    now = now or datetime.utcnow()
+    created_before = now - timedelta(days=settings.ATTENDANCE_SYNC_KEY_RETENTION_DAYS)
+    
+    result = await db.execute(
+        delete(AttendanceSyncKey).where(AttendanceSyncKey.created_at < created_before)
+    )
+    return result.rowcount
+
+
+async def sweep_subscriptions() -> dict:
+    """Run one sweep in its own transaction and return the counts.
+    
+    run_subscription_sweeper makes sure only one worker calls it.
+    """
+    async with AsyncSessionLocal() as session:
+        try:
+            counts = await deactivate_stale_subscriptions(session)
+            counts['refresh_tokens_purged'] = await purge_refresh_tokens(session)
+            counts['sync_keys_purged'] = await purge_attendance_sync_keys(session)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+    
+    metrics.increment("subscriptions.deactivated.expired", counts['expired'])
+    metrics.increment("subscriptions.deactivated.exhausted", counts['exhausted'])
+    metrics.increment("refresh_tokens.purged", counts['refresh_tokens_purged'])
+    metrics.increment("attendance_sync_keys.purged", counts['sync_keys_purged'])
+    metrics.increment("subscriptions.sweeps")
+    
+    return counts
+
+
+async def _sweep_and_report() -> None:
+    try:
+        counts = await sweep_subscriptions()
+        if counts['expired'] or counts['exhausted']:
+            print(
+                f"INFO: Deactivated subscriptions - expired: {counts['expired']}, "
+                f"exhausted: {counts['exhausted']}"
+            )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"ERROR in subscription sweeper: {type(e).__name__}: {e}")
+        metrics.increment("subscriptions.sweep_errors")
+
+
+async def _try_lock(connection: AsyncConnection) -> bool:
+    locked = await connection.scalar(select(func.pg_try_advisory_lock(SWEEPER_LOCK_KEY)))
+    # Сессионный lock переживает commit; соединение не висит в открытой транзакции
+    await connection.commit()
+    return bool(locked)
+
+
+async def _release_lock(connection: AsyncConnection) -> None:
+    try:
+        await connection.execute(select(func.pg_advisory_unlock(SWEEPER_LOCK_KEY)))
+        await connection.commit()
+    except Exception:
+        # Соединение вернется в пул - закрываем его, чтобы lock точно снялся
+        await connection.invalidate()
+
+
+async def run_subscription_sweeper(interval_seconds: int) -> None:
+    """Sweep subscriptions every `interval_seconds` until cancelled.
+    
+    Only the worker holding the session-level advisory lock on its own
+    connection sweeps; the others retry every interval and take over when
+    that worker stops.
+    """
+    while True:
+        try:
+            async with engine.connect() as lock_connection:
+                if await _try_lock(lock_connection):
+                    print("INFO: Subscription sweeper runs in this worker")
+                    try:
+                        while True:
+                            await _sweep_and_report()
+                            await asyncio.sleep(interval_seconds)
+                            # Пока соединение живо, lock держится за этим воркером
+                            await lock_connection.execute(select(1))
+                            await lock_connection.commit()
+                    finally:
+                        await _release_lock(lock_connection)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR in subscription sweeper: {type(e).__name__}: {e}")
+            metrics.increment("subscriptions.sweep_errors")
+        
+        await asyncio.sleep(interval_seconds)
+
+
+def start_subscription_sweeper() -> Optional[asyncio.Task]:
+    """Start the sweeper task if enabled in settings."""
+    if not settings.SUBSCRIPTION_SWEEP_ENABLED:
+        return None
+    return asyncio.create_task(run_subscription_sweeper(settings.SUBSCRIPTION_SWEEP_INTERVAL_SECONDS))
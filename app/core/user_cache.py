@@ -0,0 +1,159 @@
+"""In-process caches for request authentication.
+
+get_current_user resolves a token to a user id through the token cache and
+the user id to an immutable snapshot through the user cache, so the hot
+path needs neither JWT decoding nor a database query. Snapshots are dropped
+when a change of the user row commits in this process; the TTL bounds
+staleness across workers.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.config import settings
+from app.models.user import User
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a TTL."""
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None if missing or expired."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value; the least recently used entry is evicted when full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+    
+    def pop(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of the authenticated user.
+    
+    Has the same attributes as User that endpoints and UserResponse use.
+    """
+    id: uuid.UUID
+    username: str
+    email: str
+    full_name: str
+    is_active: bool
+    is_admin: bool
+    created_at: datetime
+    updated_at: datetime
+    tokens_revoked_at: Optional[datetime] = None
+    
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=user.is_active,
+            is_admin=user.is_admin,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            tokens_revoked_at=user.tokens_revoked_at,
+        )
+    
+    def accepts_token_issued_at(self, issued_at: float) -> bool:
+        """Check a token's iat (unix time, with fractions) against the user's revocation time."""
+        if self.tokens_revoked_at is None:
+            return True
+        return issued_at > self.tokens_revoked_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+# token -> (user id, issued at) (validated claims)
+token_cache = TTLCache(settings.TOKEN_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+# user id -> UserSnapshot
+user_cache = TTLCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+# Растет при каждой инвалидации: снимок, прочитанный из базы до нее,
+# не попадает в кэш (иначе параллельный запрос вернет старые данные)
+_generation = 0
+
+# Ключ в Session.info: пользователи, измененные в текущей транзакции
+_PENDING_INVALIDATIONS = "invalidated_user_ids"
+
+
+def user_cache_generation() -> int:
+    """Current invalidation generation; pass it to cache_user_snapshot."""
+    return _generation
+
+
+def cache_user_snapshot(snapshot: UserSnapshot, generation: int) -> None:
+    """Cache a snapshot unless a user was invalidated since it was read."""
+    if generation == _generation:
+        user_cache.set(snapshot.id, snapshot)
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    """Drop the cached snapshot of a user (after update, deactivation or delete)."""
+    global _generation
+    _generation += 1
+    user_cache.pop(user_id)
+
+
+def invalidate_user_on_commit(session: Session, user_id: uuid.UUID) -> None:
+    """Drop the cached snapshot once the session's transaction commits.
+    
+    Invalidating before commit lets another request cache the old row again.
+    """
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User) -> None:
+    invalidate_user_on_commit(object_session(target), target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_users(session: Session, previous_transaction) -> None:
+    # Откат savepoint не отменяет изменений внешней транзакции
+    if previous_transaction.nested:
+        return
+    session.info.pop(_PENDING_INVALIDATIONS, None)
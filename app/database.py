@@ -1,15 +1,86 @@
 """Database connection and session management."""
+import asyncio
+import time
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.core import metrics
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long a checkout waited for a connection.
+    
+    The wait includes opening a new connection when the pool has none idle.
+    """
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.increment("db.pool.checkouts")
+            metrics.increment("db.pool.wait_seconds", time.perf_counter() - started)
+
 
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    future=True
+    future=True,
+    poolclass=MeteredQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        # Кэш подготовленных запросов SQLAlchemy и собственный кэш asyncpg
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    },
 )
 
+
+def _report_pool_usage(*args) -> None:
+    pool = engine.pool
+    metrics.set_gauge("db.pool.checked_out", pool.checkedout())
+    metrics.set_gauge("db.pool.overflow", max(pool.overflow(), 0))
+
+
+def _report_connect(*args) -> None:
+    metrics.increment("db.pool.connects")
+
+
+event.listen(engine.sync_engine.pool, "checkout", _report_pool_usage)
+event.listen(engine.sync_engine.pool, "checkin", _report_pool_usage)
+event.listen(engine.sync_engine.pool, "connect", _report_connect)
+
+
+async def warm_up_pool(size: int = settings.DB_POOL_WARMUP_SIZE) -> int:
+    """Open up to `size` pool connections at startup so first requests skip connection setup.
+    
+    Returns the number of connections opened; failures are logged, not raised.
+    """
+    size = min(size, settings.DB_POOL_SIZE)
+    if size <= 0:
+        return 0
+    
+    # Соединения держатся одновременно, иначе пул вернет одно и то же
+    results = await asyncio.gather(*(engine.connect() for _ in range(size)), return_exceptions=True)
+    
+    opened = 0
+    for result in results:
+        if isinstance(result, BaseException):
+            print(f"WARNING: database pool warm-up failed: {result}")
+            continue
+        await result.close()
+        opened += 1
+    
+    return opened
+
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
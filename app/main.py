@@ -1,13 +1,17 @@
 """Main FastAPI application."""
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
+from sqlalchemy import text
 
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, warm_up_pool
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.core.subscription_sweeper import start_subscription_sweeper
 from app.api import auth, groups, students, attendance, subscriptions, payments, tournaments, settings as settings_api
 
 
@@ -16,11 +20,22 @@ async def lifespan(app: FastAPI):
     """Lifespan events for the application."""
     # Startup: Create tables
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
     
+    await warm_up_pool()
+    
+    sweeper_task = start_subscription_sweeper()
+    
     yield
     
     # Shutdown
+    if sweeper_task:
+        sweeper_task.cancel()
+        try:
+            await sweeper_task
+        except asyncio.CancelledError:
+            pass
     await engine.dispose()
 
 
@@ -39,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include API routers
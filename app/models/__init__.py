@@ -4,8 +4,11 @@ from app.models.group import Group
 from app.models.student import Student
 from app.models.subscription import Subscription
 from app.models.attendance import Attendance
+from app.models.attendance_rollup import AttendanceMonthlyRollup
+from app.models.attendance_sync import AttendanceSyncKey
 from app.models.payment import Payment
 from app.models.tournament import Tournament, TournamentParticipation
+from app.models.refresh_token import RefreshToken
 
 __all__ = [
     "User",
@@ -13,7 +16,10 @@ __all__ = [
     "Student",
     "Subscription",
     "Attendance",
+    "AttendanceMonthlyRollup",
+    "AttendanceSyncKey",
     "Payment",
     "Tournament",
     "TournamentParticipation",
+    "RefreshToken",
 ]
@@ -1,7 +1,7 @@
 """Attendance model for tracking student attendance."""
 import uuid
 from datetime import datetime, date
-from sqlalchemy import DateTime, Date, Enum as SQLEnum, ForeignKey, Text, UniqueConstraint
+from sqlalchemy import DateTime, Date, Enum as SQLEnum, ForeignKey, Text, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional
@@ -22,6 +22,7 @@ class Attendance(Base):
     __tablename__ = "attendances"
     __table_args__ = (
         UniqueConstraint('student_id', 'group_id', 'session_date', name='uq_attendance_student_group_date'),
+        Index('ix_attendances_group_id_session_date', 'group_id', 'session_date'),
     )
     
     id: Mapped[uuid.UUID] = mapped_column(
@@ -0,0 +1,42 @@
+"""Monthly attendance rollup model."""
+import uuid
+from sqlalchemy import Integer, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class AttendanceMonthlyRollup(Base):
+    """Per student, group and month attendance counters.
+    
+    Kept in sync by the attendance write endpoints; can be recomputed from
+    the attendances table with rebuild_attendance_rollup.py.
+    """
+    
+    __tablename__ = "attendance_monthly_rollups"
+    __table_args__ = (
+        Index('ix_attendance_monthly_rollups_year_month', 'year', 'month'),
+    )
+    
+    group_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("groups.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    student_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    present_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    absent_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    transferred_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    
+    def __repr__(self) -> str:
+        return (
+            f"<AttendanceMonthlyRollup(group_id={self.group_id}, student_id={self.student_id}, "
+            f"{self.year}-{self.month:02d})>"
+        )
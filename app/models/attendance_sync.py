@@ -0,0 +1,35 @@
+"""Attendance sync idempotency key model."""
+import uuid
+from datetime import datetime, date
+from sqlalchemy import String, Date, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+from app.constants import IDEMPOTENCY_KEY_MAX_LENGTH
+
+
+class AttendanceSyncKey(Base):
+    """Idempotency key of an already applied offline attendance block.
+    
+    Keys are scoped per user, so a replayed block is recognised and skipped.
+    They are purged after ATTENDANCE_SYNC_KEY_RETENTION_DAYS by the sweeper.
+    """
+    
+    __tablename__ = "attendance_sync_keys"
+    
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    idempotency_key: Mapped[str] = mapped_column(String(IDEMPOTENCY_KEY_MAX_LENGTH), primary_key=True)
+    group_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("groups.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    session_date: Mapped[date] = mapped_column(Date, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<AttendanceSyncKey(user_id={self.user_id}, key={self.idempotency_key})>"
@@ -70,12 +70,14 @@ class Group(Base):
     students: Mapped[list["Student"]] = relationship(
         "Student", 
         back_populates="group",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     attendances: Mapped[list["Attendance"]] = relationship(
         "Attendance", 
         back_populates="group",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     
     def __repr__(self) -> str:
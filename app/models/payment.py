@@ -1,7 +1,7 @@
 """Payment model for tracking student payments."""
 import uuid
 from datetime import date, datetime
-from sqlalchemy import Date, DateTime, Enum as SQLEnum, ForeignKey, Numeric, Text
+from sqlalchemy import Date, DateTime, Enum as SQLEnum, ForeignKey, Numeric, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional
@@ -28,6 +28,9 @@ class Payment(Base):
     """Payment model for tracking student payments."""
     
     __tablename__ = "payments"
+    __table_args__ = (
+        Index('ix_payments_student_id_payment_month_status', 'student_id', 'payment_month', 'status'),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), 
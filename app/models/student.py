@@ -1,8 +1,8 @@
 """Student model."""
 import uuid
 from datetime import date, datetime
-from sqlalchemy import Boolean, String, Date, DateTime, Text, ForeignKey, ARRAY
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Boolean, String, Date, DateTime, Text, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional, List
 from app.database import Base
@@ -12,6 +12,14 @@ class Student(Base):
     """Student model representing sambo students."""
     
     __tablename__ = "students"
+    __table_args__ = (
+        # Триграммные индексы для поиска (требуют расширения pg_trgm)
+        Index('ix_students_full_name_trgm', 'full_name', postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'}),
+        Index('ix_students_phone_trgm', 'phone', postgresql_using='gin', postgresql_ops={'phone': 'gin_trgm_ops'}),
+        Index('ix_students_email_trgm', 'email', postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}),
+        # Для выборок по дополнительным группам (@>, &&)
+        Index('ix_students_additional_group_ids', 'additional_group_ids', postgresql_using='gin'),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), 
@@ -49,22 +57,26 @@ class Student(Base):
     subscriptions: Mapped[list["Subscription"]] = relationship(
         "Subscription", 
         back_populates="student",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     attendances: Mapped[list["Attendance"]] = relationship(
         "Attendance", 
         back_populates="student",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     payments: Mapped[list["Payment"]] = relationship(
         "Payment", 
         back_populates="student",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     tournament_participations: Mapped[list["TournamentParticipation"]] = relationship(
         "TournamentParticipation", 
         back_populates="student",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     
     def __repr__(self) -> str:
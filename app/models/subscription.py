@@ -47,11 +47,13 @@ class Subscription(Base):
     student: Mapped["Student"] = relationship("Student", back_populates="subscriptions")
     attendances: Mapped[list["Attendance"]] = relationship(
         "Attendance", 
-        back_populates="subscription"
+        back_populates="subscription",
+        passive_deletes=True
     )
     payments: Mapped[list["Payment"]] = relationship(
         "Payment", 
-        back_populates="subscription"
+        back_populates="subscription",
+        passive_deletes=True
     )
     
     def __repr__(self) -> str:
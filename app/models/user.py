@@ -4,6 +4,7 @@ from datetime import datetime
 from sqlalchemy import Boolean, String, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from typing import Optional
 from app.database import Base
 
 
@@ -30,6 +31,8 @@ class User(Base):
         onupdate=datetime.utcnow, 
         nullable=False
     )
+    # Access tokens issued before this moment are rejected
+    tokens_revoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     # Relationships
     groups: Mapped[list["Group"]] = relationship(
@@ -1,9 +1,10 @@
 """Attendance schemas for API validation."""
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime, date
 import uuid
 from app.models.attendance import AttendanceStatus
+from app.constants import MAX_SYNC_BLOCKS, IDEMPOTENCY_KEY_MAX_LENGTH
 
 
 class AttendanceBase(BaseModel):
@@ -58,3 +59,27 @@ class AttendanceWithDetails(AttendanceResponse):
     """Schema for attendance with student details."""
     student_name: str
     group_name: str
+
+
+class AttendanceSyncBlock(BaseModel):
+    """One offline-marked session to replay."""
+    idempotency_key: str = Field(..., min_length=1, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
+    group_id: uuid.UUID
+    session_date: date
+    attendances: List[dict] = Field(
+        ..., 
+        description="Same format as in AttendanceMarkRequest"
+    )
+
+
+class AttendanceSyncRequest(BaseModel):
+    """Schema for replaying several offline sessions at once."""
+    blocks: List[AttendanceSyncBlock] = Field(..., max_length=MAX_SYNC_BLOCKS)
+
+
+class AttendanceSyncResult(BaseModel):
+    """Result of one replayed block."""
+    idempotency_key: str
+    status: Literal["applied", "duplicate", "error"]
+    attendances: List[AttendanceResponse] = []
+    detail: Optional[str] = None
@@ -3,6 +3,10 @@ from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
 from typing import Optional, Union, List
 from datetime import date
 import uuid
+from app.schemas.subscription import SubscriptionResponse
+from app.schemas.payment import PaymentResponse
+from app.schemas.attendance import AttendanceResponse
+from app.schemas.tournament import StudentTournamentStats
 
 
 class StudentBase(BaseModel):
@@ -88,9 +92,43 @@ class StudentResponse(StudentBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class StudentSearchResult(BaseModel):
+    """Schema for student search (typeahead) result."""
+    id: uuid.UUID
+    full_name: str
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    group_id: uuid.UUID
+    is_active: bool
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
 class StudentWithStats(StudentResponse):
     """Schema for student with statistics."""
     active_subscription: Optional[dict] = None
     total_attendances: int = 0
+    expected_sessions: int = 0
     total_tournaments: int = 0
     total_wins: int = 0
+
+
+class StudentProfileStatistics(BaseModel):
+    """Totals shown on the student card."""
+    total_attendances: int = 0
+    expected_sessions: int = 0
+    total_tournaments: int = 0
+    total_wins: int = 0
+
+
+class StudentProfile(BaseModel):
+    """Student card: the student and the sections requested with include=.
+    
+    Sections that were not requested are null.
+    """
+    student: StudentResponse
+    statistics: Optional[StudentProfileStatistics] = None
+    subscriptions: Optional[List[SubscriptionResponse]] = None
+    payments: Optional[List[PaymentResponse]] = None
+    attendance: Optional[List[AttendanceResponse]] = None
+    tournaments: Optional[StudentTournamentStats] = None
@@ -48,3 +48,10 @@ class SubscriptionUsage(BaseModel):
     remaining_sessions: int
     used_sessions: int
     usage_percentage: float
+
+
+class StudentSubscriptionUsage(SubscriptionUsage):
+    """Schema for subscription usage in bulk responses."""
+    student_id: uuid.UUID
+    is_active: bool
+    expected_sessions: int = 0
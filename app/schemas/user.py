@@ -48,6 +48,17 @@ class Token(BaseModel):
     """Schema for JWT token response."""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    """Schema for exchanging or revoking a refresh token."""
+    refresh_token: str = Field(..., min_length=1, max_length=200)
+
+
+class RevokeTokensRequest(BaseModel):
+    """Schema for revoking all tokens of a user (own tokens if user_id is omitted)."""
+    user_id: Optional[uuid.UUID] = None
 
 
 class TokenData(BaseModel):
@@ -1,6 +1,8 @@
 """Date and time helper utilities."""
 from datetime import date, datetime, timedelta
 from typing import Tuple
+from sqlalchemy import and_
+from sqlalchemy.sql.elements import ColumnElement
 
 
 def get_month_range(year: int, month: int) -> Tuple[date, date]:
@@ -23,6 +25,21 @@ def get_year_range(year: int) -> Tuple[date, date]:
     return first_day, last_day
 
 
+def month_filter(column, year: int, month: int) -> ColumnElement[bool]:
+    """Half-open range predicate matching dates of a month.
+    
+    Unlike extract('month'/'year', column) this can use an index on column.
+    """
+    first_day, last_day = get_month_range(year, month)
+    return and_(column >= first_day, column < last_day + timedelta(days=1))
+
+
+def year_filter(column, year: int) -> ColumnElement[bool]:
+    """Half-open range predicate matching dates of a year."""
+    first_day, last_day = get_year_range(year)
+    return and_(column >= first_day, column < last_day + timedelta(days=1))
+
+
 def get_current_reporting_month() -> date:
     """Get the current reporting month (1st of current month)."""
     today = date.today()
@@ -0,0 +1,87 @@
+"""Keyset pagination and sparse fieldset helpers."""
+import base64
+import binascii
+import json
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode sort key values of the last returned row into an opaque cursor."""
+    raw = json.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> List[str]:
+    """Decode a cursor back into its sort key values.
+    
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    
+    return values
+
+
+def keyset_after(columns: Sequence[Any], cursor: str, parsers: Sequence[Callable[[str], Any]]):
+    """Build the `(columns) > (cursor values)` condition for ascending keyset pagination.
+    
+    Raises ValueError if the cursor is malformed.
+    """
+    values = decode_cursor(cursor)
+    if len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+    
+    try:
+        after = tuple(parse(value) for parse, value in zip(parsers, values))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    
+    return tuple_(*columns) > after
+
+
+def split_page(rows: list, limit: int, key: Callable[[Any], tuple]) -> Tuple[list, Optional[str]]:
+    """Trim the extra row fetched with `limit + 1` and return the next page cursor."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(*key(rows[-1]))
+    return rows, None
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields=` parameter (sparse fieldset).
+    
+    Returns None when all fields are requested. Raises ValueError on unknown fields.
+    """
+    if not fields:
+        return None
+    
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    
+    # Сохраняем порядок, убираем повторы
+    return list(dict.fromkeys(requested)) or None
+
+
+def dump_fields(model: type[BaseModel], row: Any, selected: Sequence[str]) -> dict:
+    """Serialize the selected fields of a row through the response model.
+    
+    Each field goes through the model's validators, so a sparse response
+    matches the same fields of the full one.
+    """
+    instance = model.model_construct()
+    for name in selected:
+        model.__pydantic_validator__.validate_assignment(instance, name, row[name])
+    return instance.model_dump(include=set(selected), mode="json")
@@ -0,0 +1,104 @@
+"""Training calendar: expands group schedules into session dates."""
+from calendar import monthrange
+from datetime import date
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+
+from app.models.group import ScheduleType
+
+# Training weekdays (0 = Monday) for each schedule type
+SCHEDULE_WEEKDAYS = {
+    ScheduleType.MON_WED_FRI: (0, 2, 4),
+    ScheduleType.TUE_THU: (1, 3),
+}
+
+# Default to all weekdays if schedule type is unknown
+DEFAULT_WEEKDAYS = (0, 1, 2, 3, 4)
+
+# Max number of (schedule signature, month) entries kept in memory
+CALENDAR_CACHE_SIZE = 1024
+
+ScheduleSignature = Tuple[Tuple[int, ...], FrozenSet[date]]
+
+
+def _parse_weekdays(days) -> Tuple[int, ...]:
+    """Parse custom weekdays (0 = Monday ... 6 = Sunday), skipping invalid values."""
+    weekdays = set()
+    for day in days or []:
+        try:
+            day = int(day)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= day <= 6:
+            weekdays.add(day)
+    return tuple(sorted(weekdays))
+
+
+def _parse_holidays(holidays) -> FrozenSet[date]:
+    """Parse ISO holiday dates, skipping invalid values."""
+    parsed = set()
+    for holiday in holidays or []:
+        try:
+            parsed.add(date.fromisoformat(str(holiday)))
+        except ValueError:
+            continue
+    return frozenset(parsed)
+
+
+def schedule_signature(schedule_type, schedule: Optional[dict] = None) -> ScheduleSignature:
+    """Build a hashable signature of a group schedule.
+    
+    schedule is the optional Group.schedule JSON, e.g.
+    {"days": [0, 2, 4], "holidays": ["2025-12-31"]}. Custom "days" replace
+    the weekdays of schedule_type; "holidays" are excluded from sessions.
+    """
+    try:
+        weekdays = SCHEDULE_WEEKDAYS[ScheduleType(schedule_type)]
+    except ValueError:
+        weekdays = DEFAULT_WEEKDAYS
+    
+    holidays = frozenset()
+    if isinstance(schedule, dict):
+        weekdays = _parse_weekdays(schedule.get('days')) or weekdays
+        holidays = _parse_holidays(schedule.get('holidays'))
+    
+    return weekdays, holidays
+
+
+@lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+def _month_session_dates(signature: ScheduleSignature, year: int, month: int) -> Tuple[date, ...]:
+    """Get all session dates of a month for a schedule signature."""
+    weekdays, holidays = signature
+    _, last_day = monthrange(year, month)
+    
+    return tuple(
+        current_date
+        for current_date in (date(year, month, day) for day in range(1, last_day + 1))
+        if current_date.weekday() in weekdays and current_date not in holidays
+    )
+
+
+def get_month_session_dates(group, year: int, month: int) -> Tuple[date, ...]:
+    """Get training dates of a group in a month."""
+    return _month_session_dates(schedule_signature(group.schedule_type, group.schedule), year, month)
+
+
+def is_session_day(group, day: date) -> bool:
+    """Check whether a group trains on a given day."""
+    return day in get_month_session_dates(group, day.year, day.month)
+
+
+def get_session_dates(group, start: date, end: date) -> List[date]:
+    """Get training dates of a group between start and end (inclusive)."""
+    signature = schedule_signature(group.schedule_type, group.schedule)
+    session_dates = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        session_dates.extend(d for d in _month_session_dates(signature, year, month) if start <= d <= end)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return session_dates
+
+
+def count_session_dates(group, start: date, end: date) -> int:
+    """Count expected training sessions of a group between start and end (inclusive)."""
+    return len(get_session_dates(group, start, end))
@@ -0,0 +1,29 @@
+"""Script to rebuild the monthly attendance rollup from raw attendance records."""
+import asyncio
+
+from app.database import AsyncSessionLocal
+from app.core.attendance_rollup import rebuild_attendance_rollup
+
+
+async def rebuild():
+    """Recompute attendance_monthly_rollups from the attendances table."""
+    print("=== Пересчёт месячной статистики посещаемости ===\n")
+    
+    async with AsyncSessionLocal() as session:
+        try:
+            rows = await rebuild_attendance_rollup(session)
+            await session.commit()
+            print(f"✅ Пересчитано записей: {rows}")
+        except Exception as e:
+            print(f"\n❌ Ошибка: {e}")
+            await session.rollback()
+            raise
+
+
+def main():
+    """Run the rebuild script."""
+    asyncio.run(rebuild())
+
+
+if __name__ == "__main__":
+    main()
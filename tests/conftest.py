@@ -4,6 +4,7 @@ import asyncio
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 from typing import AsyncGenerator
 
 from app.main import app
@@ -30,6 +31,7 @@ async def test_engine():
     
     # Create all tables
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
     
     yield engine
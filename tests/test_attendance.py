@@ -3,6 +3,7 @@ import pytest
 from httpx import AsyncClient
 from datetime import date, datetime
 from decimal import Decimal
+import uuid
 
 
 class TestAttendanceMarking:
@@ -125,6 +126,67 @@ class TestAttendanceMarking:
         assert partial_payment.status.value == "pending"
         assert "перенос" in partial_payment.notes.lower()
     
+    @pytest.mark.asyncio
+    async def test_mark_attendance_transferred_uses_updated_price(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        db_session
+    ):
+        """Test that compensation uses prices updated through settings."""
+        from app.models.subscription import Subscription, SubscriptionType
+        from app.models.payment import Payment
+        from sqlalchemy import select
+        
+        subscription = Subscription(
+            student_id=test_student.id,
+            subscription_type=SubscriptionType.EIGHT_SESSIONS,
+            total_sessions=8,
+            remaining_sessions=8,
+            price=Decimal("4000.00"),
+            start_date=date(2025, 9, 1),
+            expiry_date=date(2025, 11, 1),
+            is_active=True
+        )
+        db_session.add(subscription)
+        await db_session.commit()
+        
+        prices_response = await client.put(
+            "/api/settings/prices/update",
+            json={
+                "subscription_8_senior_price": 4000,
+                "subscription_8_junior_price": 3600,
+                "subscription_12_senior_price": 4800,
+                "subscription_12_junior_price": 4200
+            },
+            headers=auth_headers
+        )
+        assert prices_response.status_code == 200
+        
+        response = await client.post(
+            "/api/attendance/mark",
+            json={
+                "group_id": str(test_group.id),
+                "session_date": "2025-09-15",
+                "attendances": [
+                    {"student_id": str(test_student.id), "status": "transferred", "notes": None}
+                ]
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 201
+        
+        payments_result = await db_session.execute(
+            select(Payment).where(
+                Payment.student_id == test_student.id,
+                Payment.payment_month == date(2025, 10, 1)
+            )
+        )
+        payment = payments_result.scalars().first()
+        assert payment.amount == Decimal("500.00")  # 4000 / 8
+    
     @pytest.mark.asyncio
     async def test_mark_attendance_null_status_removes_record(
         self, 
@@ -247,6 +309,308 @@ class TestAttendanceMarking:
         assert response.status_code == 201
         result = response.json()
         assert len(result) == 0
+    
+    @pytest.mark.asyncio
+    async def test_mark_attendance_whole_group(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        test_user,
+        db_session
+    ):
+        """Test marking several students at once keeps payload order."""
+        from app.models.student import Student
+        
+        second_student = Student(
+            full_name="Второй Ученик",
+            birth_date=date(2011, 2, 2),
+            phone="+79991234568",
+            group_id=test_group.id,
+            trainer_id=test_user.id,
+            is_active=True
+        )
+        db_session.add(second_student)
+        await db_session.commit()
+        
+        data = {
+            "group_id": str(test_group.id),
+            "session_date": "2025-10-10",
+            "attendances": [
+                {"student_id": str(second_student.id), "status": "absent", "notes": None},
+                {"student_id": str(test_student.id), "status": "present", "notes": None}
+            ]
+        }
+        
+        response = await client.post(
+            "/api/attendance/mark",
+            json=data,
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 201
+        result = response.json()
+        assert [r["student_id"] for r in result] == [str(second_student.id), str(test_student.id)]
+        assert [r["status"] for r in result] == ["absent", "present"]
+    
+    @pytest.mark.asyncio
+    async def test_mark_attendance_updates_existing(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        db_session
+    ):
+        """Test that marking the same session again updates the existing record."""
+        from app.models.attendance import Attendance
+        from sqlalchemy import select
+        
+        data = {
+            "group_id": str(test_group.id),
+            "session_date": "2025-10-13",
+            "attendances": [
+                {"student_id": str(test_student.id), "status": "present", "notes": None}
+            ]
+        }
+        first = await client.post("/api/attendance/mark", json=data, headers=auth_headers)
+        assert first.status_code == 201
+        
+        data["attendances"][0]["status"] = "absent"
+        data["attendances"][0]["notes"] = "Опоздал на автобус"
+        second = await client.post("/api/attendance/mark", json=data, headers=auth_headers)
+        
+        assert second.status_code == 201
+        result = second.json()
+        assert result[0]["id"] == first.json()[0]["id"]
+        assert result[0]["status"] == "absent"
+        assert result[0]["notes"] == "Опоздал на автобус"
+        
+        records = await db_session.execute(
+            select(Attendance).where(
+                Attendance.student_id == test_student.id,
+                Attendance.session_date == date(2025, 10, 13)
+            )
+        )
+        assert len(records.scalars().all()) == 1
+
+    
+    @pytest.mark.asyncio
+    async def test_mark_attendance_uses_last_session(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        db_session
+    ):
+        """Test that a session is written off once and the last one deactivates the subscription."""
+        from app.models.subscription import Subscription, SubscriptionType
+        from sqlalchemy import select
+        
+        subscription = Subscription(
+            student_id=test_student.id,
+            subscription_type=SubscriptionType.EIGHT_SESSIONS,
+            total_sessions=8,
+            remaining_sessions=1,
+            price=Decimal("4200.00"),
+            start_date=date(2025, 10, 1),
+            expiry_date=date(2025, 12, 1),
+            is_active=True
+        )
+        db_session.add(subscription)
+        await db_session.commit()
+        
+        data = {
+            "group_id": str(test_group.id),
+            "session_date": "2025-10-15",
+            "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+        }
+        # Повторная отметка того же занятия не списывает занятие еще раз
+        for _ in range(2):
+            response = await client.post("/api/attendance/mark", json=data, headers=auth_headers)
+            assert response.status_code == 201
+        
+        result = await db_session.execute(
+            select(Subscription.remaining_sessions, Subscription.is_active)
+            .where(Subscription.id == subscription.id)
+        )
+        remaining_sessions, is_active = result.one()
+        assert remaining_sessions == 0
+        assert is_active == False
+    
+    @pytest.mark.asyncio
+    async def test_mark_attendance_statement_count_is_constant(
+        self, 
+        client: AsyncClient, 
+        test_group,
+        test_user,
+        db_session
+    ):
+        """Test that /mark runs the same number of statements for 1 and for N students."""
+        from sqlalchemy import event
+        from app.models.student import Student
+        from app.core.security import create_access_token
+        
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(test_user.id)})}"}
+        students = [
+            Student(
+                full_name=f"Ученик {i}",
+                birth_date=date(2010, 1, 1),
+                phone="+79990000000",
+                group_id=test_group.id,
+                trainer_id=test_user.id
+            )
+            for i in range(10)
+        ]
+        db_session.add_all(students)
+        await db_session.commit()
+        
+        async def count_statements(session_date: str, marked_students) -> int:
+            statements = []
+            
+            def record(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            
+            engine = db_session.bind.sync_engine
+            event.listen(engine, "before_cursor_execute", record)
+            try:
+                response = await client.post(
+                    "/api/attendance/mark",
+                    json={
+                        "group_id": str(test_group.id),
+                        "session_date": session_date,
+                        "attendances": [
+                            {"student_id": str(student.id), "status": "present"}
+                            for student in marked_students
+                        ]
+                    },
+                    headers=headers
+                )
+            finally:
+                event.remove(engine, "before_cursor_execute", record)
+            
+            assert response.status_code == 201
+            assert len(response.json()) == len(marked_students)
+            return len(statements)
+        
+        # Прогрев кэшей (пользователь, токен)
+        await count_statements("2025-11-03", students[:1])
+        
+        single = await count_statements("2025-11-05", students[:1])
+        many = await count_statements("2025-11-07", students)
+        
+        assert single == many
+    
+    @pytest.mark.asyncio
+    async def test_sync_attendance_skips_replayed_blocks(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group
+    ):
+        """Test that a replayed sync block is reported as duplicate and not applied twice."""
+        data = {
+            "blocks": [
+                {
+                    "idempotency_key": "offline-2025-10-20",
+                    "group_id": str(test_group.id),
+                    "session_date": "2025-10-20",
+                    "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+                },
+                {
+                    "idempotency_key": "offline-2025-10-22",
+                    "group_id": str(uuid.uuid4()),
+                    "session_date": "2025-10-22",
+                    "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+                }
+            ]
+        }
+        first = await client.post("/api/attendance/sync", json=data, headers=auth_headers)
+        
+        assert first.status_code == 200
+        result = first.json()
+        assert [block["status"] for block in result] == ["applied", "error"]
+        assert result[0]["attendances"][0]["student_id"] == str(test_student.id)
+        
+        # Повтор после обрыва связи
+        data["blocks"][0]["attendances"][0]["status"] = "absent"
+        second = await client.post("/api/attendance/sync", json=data, headers=auth_headers)
+        
+        assert second.status_code == 200
+        assert second.json()[0]["status"] == "duplicate"
+        
+        history = await client.get(f"/api/attendance/student/{test_student.id}", headers=auth_headers)
+        records = [a for a in history.json() if a["session_date"] == "2025-10-20"]
+        assert len(records) == 1
+        assert records[0]["status"] == "present"
+    
+    @pytest.mark.asyncio
+    async def test_sync_attendance_reports_only_expected_errors(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        monkeypatch
+    ):
+        """Test that database errors fail a block while programming errors propagate."""
+        from sqlalchemy.exc import DBAPIError
+        from app.api import attendance as attendance_api
+        
+        def block(key: str) -> dict:
+            return {
+                "idempotency_key": key,
+                "group_id": str(test_group.id),
+                "session_date": "2025-10-24",
+                "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+            }
+        
+        async def fail_with_db_error(*args, **kwargs):
+            raise DBAPIError("INSERT ...", {}, Exception("deadlock detected"))
+        
+        monkeypatch.setattr(attendance_api, "_apply_marks", fail_with_db_error)
+        response = await client.post("/api/attendance/sync", json={"blocks": [block("db-error")]}, headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.json()[0]["status"] == "error"
+        
+        async def fail_with_bug(*args, **kwargs):
+            raise TypeError("unexpected argument")
+        
+        monkeypatch.setattr(attendance_api, "_apply_marks", fail_with_bug)
+        with pytest.raises(TypeError):
+            await client.post("/api/attendance/sync", json={"blocks": [block("bug")]}, headers=auth_headers)
+    
+    @pytest.mark.asyncio
+    async def test_purge_attendance_sync_keys(self, test_user, test_group, db_session):
+        """Test that only idempotency keys past the retention period are purged."""
+        from datetime import date, datetime, timedelta
+        from sqlalchemy import select
+        from app.config import settings
+        from app.models.attendance_sync import AttendanceSyncKey
+        from app.core.subscription_sweeper import purge_attendance_sync_keys
+        
+        now = datetime.utcnow()
+        for key, age_days in (("old", settings.ATTENDANCE_SYNC_KEY_RETENTION_DAYS + 1), ("recent", 1)):
+            db_session.add(AttendanceSyncKey(
+                user_id=test_user.id,
+                idempotency_key=key,
+                group_id=test_group.id,
+                session_date=date(2025, 10, 20),
+                created_at=now - timedelta(days=age_days)
+            ))
+        await db_session.commit()
+        
+        assert await purge_attendance_sync_keys(db_session, now) == 1
+        await db_session.commit()
+        
+        result = await db_session.execute(
+            select(AttendanceSyncKey.idempotency_key).where(AttendanceSyncKey.user_id == test_user.id)
+        )
+        assert result.scalars().all() == ["recent"]
 
 
 class TestAttendanceRetrieval:
@@ -275,6 +639,51 @@ class TestAttendanceRetrieval:
         student_found = any(s["student_id"] == str(test_student.id) for s in result)
         assert student_found
     
+    @pytest.mark.asyncio
+    async def test_get_attendance_by_date_includes_additional_group_students(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        test_user,
+        db_session
+    ):
+        """Test that students with the group as additional one are in the roster."""
+        from app.models.group import Group
+        from app.models.student import Student
+        
+        other_group = Group(
+            name="Основная группа гостя",
+            age_group="senior",
+            schedule_type="tue_thu",
+            skill_level="experienced",
+            trainer_id=test_user.id
+        )
+        db_session.add(other_group)
+        await db_session.commit()
+        
+        guest = Student(
+            full_name="Гость Группы",
+            birth_date=date(2011, 5, 5),
+            phone="+79991112233",
+            group_id=other_group.id,
+            additional_group_ids=[test_group.id],
+            trainer_id=test_user.id
+        )
+        db_session.add(guest)
+        await db_session.commit()
+        
+        response = await client.get(
+            f"/api/attendance/date/{test_group.id}/2025-10-07",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        roster = {s["student_id"]: s for s in response.json()}
+        assert roster[str(test_student.id)]["is_bonus_group"] is False
+        assert roster[str(guest.id)]["is_bonus_group"] is True
+    
     @pytest.mark.asyncio
     async def test_get_attendance_invalid_date_format(
         self, 
@@ -289,6 +698,103 @@ class TestAttendanceRetrieval:
         )
         
         assert response.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_get_student_attendance_paginated(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        test_user,
+        db_session
+    ):
+        """Test keyset pagination of student attendance history."""
+        from app.models.attendance import Attendance, AttendanceStatus
+        
+        for day in (1, 3, 6):
+            db_session.add(Attendance(
+                student_id=test_student.id,
+                group_id=test_group.id,
+                session_date=date(2025, 9, day),
+                status=AttendanceStatus.PRESENT,
+                marked_by=test_user.id
+            ))
+        await db_session.commit()
+        
+        params = "date_from=2025-09-01&date_to=2025-09-30&limit=2"
+        first_page = await client.get(
+            f"/api/attendance/student/{test_student.id}?{params}",
+            headers=auth_headers
+        )
+        
+        assert first_page.status_code == 200
+        assert [a["session_date"] for a in first_page.json()] == ["2025-09-06", "2025-09-03"]
+        cursor = first_page.headers["X-Next-Cursor"]
+        
+        second_page = await client.get(
+            f"/api/attendance/student/{test_student.id}?{params}&cursor={cursor}",
+            headers=auth_headers
+        )
+        
+        assert second_page.status_code == 200
+        assert [a["session_date"] for a in second_page.json()] == ["2025-09-01"]
+        assert "X-Next-Cursor" not in second_page.headers
+    
+    @pytest.mark.asyncio
+    async def test_get_student_attendance_default_page_is_bounded(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student, 
+        test_group,
+        test_user,
+        db_session
+    ):
+        """Test that without limit at most MAX_PAGE_SIZE records come back with a next cursor."""
+        from datetime import timedelta
+        from app.constants import MAX_PAGE_SIZE
+        from app.models.attendance import Attendance, AttendanceStatus
+        
+        db_session.add_all([
+            Attendance(
+                student_id=test_student.id,
+                group_id=test_group.id,
+                session_date=date(2020, 1, 1) + timedelta(days=offset),
+                status=AttendanceStatus.PRESENT,
+                marked_by=test_user.id
+            )
+            for offset in range(MAX_PAGE_SIZE + 1)
+        ])
+        await db_session.commit()
+        
+        response = await client.get(f"/api/attendance/student/{test_student.id}", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert len(response.json()) == MAX_PAGE_SIZE
+        cursor = response.headers["X-Next-Cursor"]
+        
+        rest = await client.get(
+            f"/api/attendance/student/{test_student.id}?cursor={cursor}",
+            headers=auth_headers
+        )
+        assert rest.status_code == 200
+        assert [a["session_date"] for a in rest.json()] == ["2020-01-01"]
+    
+    @pytest.mark.asyncio
+    async def test_get_group_attendance_invalid_cursor(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_group
+    ):
+        """Test that a malformed cursor is rejected."""
+        response = await client.get(
+            f"/api/attendance/group/{test_group.id}?cursor=not-a-cursor",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 400
 
 
 class TestAttendanceStatistics:
@@ -333,3 +839,80 @@ class TestAttendanceStatistics:
             assert "full_name" in student
             assert "attendance" in student
             assert isinstance(student["attendance"], list)
+    
+    @pytest.mark.asyncio
+    async def test_get_group_detail_custom_schedule(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_group,
+        db_session
+    ):
+        """Test that custom schedule days and holidays define training dates."""
+        test_group.schedule = {"days": [5], "holidays": ["2025-10-04"]}
+        await db_session.commit()
+        
+        response = await client.get(
+            f"/api/attendance/statistics/group-detail/{test_group.id}?year=2025&month=10",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["training_dates"] == ["2025-10-11", "2025-10-18", "2025-10-25"]
+    
+    @pytest.mark.asyncio
+    async def test_get_attendance_matrix(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_group,
+        test_student
+    ):
+        """Test compact attendance matrix for a month."""
+        await client.post(
+            "/api/attendance/mark",
+            json={
+                "group_id": str(test_group.id),
+                "session_date": "2025-10-01",
+                "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+            },
+            headers=auth_headers
+        )
+        
+        response = await client.get(
+            f"/api/attendance/statistics/matrix?year=2025&month=10&group_ids={test_group.id}",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["codes"]["present"] == "P"
+        assert len(data["groups"]) == 1
+        
+        group = data["groups"][0]
+        assert group["training_days"][0] == 1
+        
+        row = next(s for s in group["students"] if s["student_id"] == str(test_student.id))
+        assert len(row["attendance"]) == len(group["training_days"])
+        assert row["attendance"][0] == "P"
+
+
+class TestTrainingCalendar:
+    """Tests for expanding group schedules into session dates."""
+    
+    def test_count_session_dates_across_months(self):
+        """Test range counts span month boundaries and skip holidays."""
+        from types import SimpleNamespace
+        from app.utils.training_calendar import count_session_dates, get_session_dates
+        
+        group = SimpleNamespace(schedule_type="mon_wed_fri", schedule=None)
+        
+        assert get_session_dates(group, date(2025, 10, 27), date(2025, 11, 7)) == [
+            date(2025, 10, 27), date(2025, 10, 29), date(2025, 10, 31),
+            date(2025, 11, 3), date(2025, 11, 5), date(2025, 11, 7),
+        ]
+        assert count_session_dates(group, date(2025, 12, 29), date(2026, 1, 2)) == 3
+        assert count_session_dates(group, date(2025, 11, 7), date(2025, 11, 6)) == 0
+        
+        group.schedule = {"holidays": ["2025-11-03"]}
+        assert count_session_dates(group, date(2025, 10, 27), date(2025, 11, 7)) == 5
@@ -0,0 +1,219 @@
+"""Tests for authentication."""
+import pytest
+from httpx import AsyncClient
+
+
+def _headers_for(user) -> dict:
+    """Authorization headers with a token for the given user."""
+    from app.core.security import create_access_token
+    
+    token = create_access_token({"sub": str(user.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestCurrentUserCache:
+    """Tests for cached resolution of the current user."""
+    
+    @pytest.mark.asyncio
+    async def test_me_uses_cached_user(self, client: AsyncClient, test_user):
+        """Test that repeated requests with the same token return the same user."""
+        headers = _headers_for(test_user)
+        
+        for _ in range(2):
+            response = await client.get("/api/auth/me", headers=headers)
+            assert response.status_code == 200
+            assert response.json()["id"] == str(test_user.id)
+            assert response.json()["username"] == test_user.username
+    
+    @pytest.mark.asyncio
+    async def test_deactivated_user_is_rejected(self, client: AsyncClient, test_user, db_session):
+        """Test that deactivating a user invalidates the cached snapshot."""
+        headers = _headers_for(test_user)
+        
+        response = await client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200
+        
+        test_user.is_active = False
+        await db_session.commit()
+        
+        response = await client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_invalid_token_is_rejected(self, client: AsyncClient):
+        """Test that a malformed token returns 401."""
+        response = await client.get("/api/auth/me", headers={"Authorization": "Bearer not-a-token"})
+        
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_snapshot_is_dropped_on_commit_only(self, client: AsyncClient, test_user, db_session):
+        """Test that a changed user stays cached until the change commits."""
+        from app.core.user_cache import user_cache
+        
+        response = await client.get("/api/auth/me", headers=_headers_for(test_user))
+        assert response.status_code == 200
+        
+        test_user.is_admin = False
+        await db_session.flush()
+        assert user_cache.get(test_user.id) is not None
+        
+        await db_session.commit()
+        assert user_cache.get(test_user.id) is None
+
+
+class TestLogin:
+    """Tests for password login."""
+    
+    @pytest.mark.asyncio
+    async def test_login_success(self, client: AsyncClient, test_user):
+        """Test login with correct credentials returns a token."""
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": test_user.username, "password": "testpassword"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["access_token"]
+    
+    @pytest.mark.asyncio
+    async def test_login_wrong_password(self, client: AsyncClient, test_user):
+        """Test login with wrong password fails."""
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": test_user.username, "password": "wrongpassword"}
+        )
+        
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_login_rehashes_on_work_factor_change(
+        self,
+        client: AsyncClient,
+        test_user,
+        db_session,
+        monkeypatch
+    ):
+        """Test that login upgrades the stored hash when BCRYPT_ROUNDS changes."""
+        from app.config import settings
+        from app.models.user import User
+        from sqlalchemy import select
+        
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+        
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": test_user.username, "password": "testpassword"}
+        )
+        assert response.status_code == 200
+        
+        result = await db_session.execute(
+            select(User.hashed_password).where(User.id == test_user.id)
+        )
+        assert result.scalar_one().startswith("$2b$04$")
+
+
+class TestRefreshTokens:
+    """Tests for the refresh token flow."""
+    
+    async def _login(self, client: AsyncClient, user) -> dict:
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": user.username, "password": "testpassword"}
+        )
+        assert response.status_code == 200
+        return response.json()
+    
+    @pytest.mark.asyncio
+    async def test_refresh_rotates_token(self, client: AsyncClient, test_user):
+        """Test that a refresh token can be used once and is replaced by a new one."""
+        tokens = await self._login(client, test_user)
+        
+        response = await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 200
+        refreshed = response.json()
+        assert refreshed["refresh_token"] != tokens["refresh_token"]
+        
+        me = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {refreshed['access_token']}"})
+        assert me.status_code == 200
+        
+        # Повторное использование старого токена отзывает и новый
+        response = await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+        response = await client.post("/api/auth/refresh", json={"refresh_token": refreshed["refresh_token"]})
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_logout_revokes_refresh_token(self, client: AsyncClient, test_user):
+        """Test that a logged out refresh token cannot be used."""
+        tokens = await self._login(client, test_user)
+        
+        response = await client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 204
+        
+        response = await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_revoke_rejects_old_access_tokens(self, client: AsyncClient, test_user):
+        """Test that revoking all tokens rejects access tokens issued before."""
+        from datetime import datetime, timedelta
+        from jose import jwt
+        from app.config import settings
+        
+        issued_at = datetime.utcnow() - timedelta(minutes=5)
+        old_token = jwt.encode(
+            {"sub": str(test_user.id), "iat": issued_at, "exp": issued_at + timedelta(hours=1)},
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
+        headers = {"Authorization": f"Bearer {old_token}"}
+        
+        response = await client.post("/api/auth/revoke", json={}, headers=headers)
+        assert response.status_code == 204
+        
+        response = await client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_token_issued_just_before_revocation_is_rejected(self, client: AsyncClient, test_user):
+        """Test that a token from the same second as the revocation is rejected."""
+        from app.core.security import create_access_token
+        
+        headers = _headers_for(test_user)
+        older = {"Authorization": f"Bearer {create_access_token({'sub': str(test_user.id)})}"}
+        
+        response = await client.post("/api/auth/revoke", json={}, headers=headers)
+        assert response.status_code == 204
+        
+        response = await client.get("/api/auth/me", headers=older)
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_purge_removes_expired_and_old_revoked_tokens(self, test_user, db_session):
+        """Test that only expired and long revoked refresh tokens are purged."""
+        from datetime import datetime, timedelta
+        from sqlalchemy import select, func
+        from app.models.refresh_token import RefreshToken
+        from app.core.refresh_tokens import purge_refresh_tokens
+        
+        now = datetime.utcnow()
+        db_session.add_all([
+            RefreshToken(user_id=test_user.id, token_hash="a" * 64, expires_at=now - timedelta(days=1)),
+            RefreshToken(
+                user_id=test_user.id, token_hash="b" * 64,
+                expires_at=now + timedelta(days=10), revoked_at=now - timedelta(days=30)
+            ),
+            RefreshToken(
+                user_id=test_user.id, token_hash="c" * 64,
+                expires_at=now + timedelta(days=10), revoked_at=now - timedelta(minutes=5)
+            ),
+            RefreshToken(user_id=test_user.id, token_hash="d" * 64, expires_at=now + timedelta(days=10)),
+        ])
+        await db_session.commit()
+        
+        assert await purge_refresh_tokens(db_session, now) == 2
+        await db_session.commit()
+        
+        remaining = await db_session.scalar(select(func.count()).select_from(RefreshToken))
+        assert remaining == 2
@@ -0,0 +1,31 @@
+"""Tests for database connection pool metrics."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from tests.conftest import TEST_DATABASE_URL
+
+
+class TestConnectionPool:
+    """Tests for the metered connection pool."""
+    
+    @pytest.mark.asyncio
+    async def test_checkout_wait_is_recorded(self):
+        """Test that every checkout is counted together with its wait time."""
+        from app.core.metrics import get_metrics
+        from app.database import MeteredQueuePool
+        
+        engine = create_async_engine(TEST_DATABASE_URL, poolclass=MeteredQueuePool, pool_size=2)
+        before = get_metrics()['counters']
+        
+        try:
+            for _ in range(2):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
+        
+        after = get_metrics()['counters']
+        assert after['db.pool.checkouts'] == before.get('db.pool.checkouts', 0) + 2
+        # Первое соединение открывается внутри ожидания
+        assert after['db.pool.wait_seconds'] > before.get('db.pool.wait_seconds', 0)
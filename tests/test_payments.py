@@ -373,3 +373,48 @@ class TestPaymentStatistics:
         assert response.status_code == 200
         result = response.json()
         assert isinstance(result, list)
+
+
+class TestPaymentAccess:
+    """Tests for access checks on payments of other trainers."""
+    
+    @pytest.mark.asyncio
+    async def test_other_trainer_gets_403_and_missing_gets_404(
+        self,
+        client: AsyncClient,
+        test_student,
+        db_session
+    ):
+        """Test that foreign payments are forbidden while unknown ones are not found."""
+        import uuid
+        from app.models.user import User
+        from app.models.payment import Payment, PaymentType
+        from app.core.security import create_access_token, get_password_hash
+        
+        trainer = User(
+            username="othertrainer",
+            email="other@example.com",
+            hashed_password=get_password_hash("testpassword"),
+            full_name="Other Trainer",
+            is_admin=False
+        )
+        payment = Payment(
+            student_id=test_student.id,
+            amount=Decimal("4200.00"),
+            payment_date=date(2025, 10, 1),
+            payment_month=date(2025, 10, 1),
+            payment_type=PaymentType.FULL
+        )
+        db_session.add_all([trainer, payment])
+        await db_session.commit()
+        
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(trainer.id)})}"}
+        
+        response = await client.put(f"/api/payments/{payment.id}", json={"notes": "x"}, headers=headers)
+        assert response.status_code == 403
+        
+        response = await client.delete(f"/api/payments/{uuid.uuid4()}", headers=headers)
+        assert response.status_code == 404
+        
+        response = await client.get(f"/api/payments/student/{test_student.id}", headers=headers)
+        assert response.status_code == 403
@@ -83,6 +83,75 @@ class TestAttendanceStatistics:
             
             # Check attendance rate is between 0 and 100
             assert 0 <= group["attendance_rate"] <= 100
+    
+    @pytest.mark.asyncio
+    async def test_get_attendance_statistics_overall_matches_groups(
+        self,
+        client: AsyncClient,
+        auth_headers: dict,
+        test_student,
+        test_group
+    ):
+        """Test that overall totals are the sum of per-group totals."""
+        for session_date, status in [("2025-10-06", "present"), ("2025-10-08", "absent")]:
+            await client.post(
+                "/api/attendance/mark",
+                json={
+                    "group_id": str(test_group.id),
+                    "session_date": session_date,
+                    "attendances": [{"student_id": str(test_student.id), "status": status}]
+                },
+                headers=auth_headers
+            )
+        
+        response = await client.get(
+            "/api/attendance/statistics/summary?year=2025&month=10",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        
+        group = next(g for g in data["groups"] if g["group_id"] == str(test_group.id))
+        assert group["present"] >= 1
+        assert group["absent"] >= 1
+        assert data["overall"]["total_sessions"] == sum(g["total_sessions"] for g in data["groups"])
+        assert data["overall"]["present"] == sum(g["present"] for g in data["groups"])
+    
+    @pytest.mark.asyncio
+    async def test_get_attendance_statistics_follows_deletes(
+        self,
+        client: AsyncClient,
+        auth_headers: dict,
+        test_student,
+        test_group
+    ):
+        """Test that deleting an attendance record is reflected in statistics."""
+        async def group_total():
+            response = await client.get(
+                "/api/attendance/statistics/summary?year=2025&month=11",
+                headers=auth_headers
+            )
+            groups = response.json()["groups"]
+            return sum(g["total_sessions"] for g in groups if g["group_id"] == str(test_group.id))
+        
+        before = await group_total()
+        
+        mark_response = await client.post(
+            "/api/attendance/mark",
+            json={
+                "group_id": str(test_group.id),
+                "session_date": "2025-11-03",
+                "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+            },
+            headers=auth_headers
+        )
+        assert await group_total() == before + 1
+        
+        attendance_id = mark_response.json()[0]["id"]
+        delete_response = await client.delete(f"/api/attendance/{attendance_id}", headers=auth_headers)
+        assert delete_response.status_code == 204
+        assert await group_total() == before
 
 
 class TestPaymentStatistics:
@@ -137,6 +206,39 @@ class TestPaymentStatistics:
         if len(data) > 0:
             current_year = date.today().year
             assert all(item["year"] == current_year for item in data)
+    
+    @pytest.mark.asyncio
+    async def test_get_payment_statistics_year_boundaries(
+        self,
+        client: AsyncClient,
+        auth_headers: dict,
+        test_student,
+        db_session
+    ):
+        """Test that payments are counted only within the requested year."""
+        from decimal import Decimal
+        from app.models.payment import Payment, PaymentType, PaymentStatus
+        
+        for payment_month in [date(2025, 12, 1), date(2026, 1, 1)]:
+            db_session.add(Payment(
+                student_id=test_student.id,
+                amount=Decimal("4200.00"),
+                payment_date=payment_month,
+                payment_month=payment_month,
+                payment_type=PaymentType.FULL,
+                status=PaymentStatus.PAID
+            ))
+        await db_session.commit()
+        
+        response = await client.get(
+            "/api/payments/statistics/summary?year=2025",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert all(item["year"] == 2025 for item in data)
+        assert any(item["month"] == 12 for item in data)
 
 
 class TestUnpaidStudents:
@@ -210,6 +312,65 @@ class TestUnpaidStudents:
         assert data["year"] == current_date.year
         assert data["month"] == current_date.month
     
+    @pytest.mark.asyncio
+    async def test_get_unpaid_students_excludes_paid(
+        self,
+        client: AsyncClient,
+        auth_headers: dict,
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test that paid students are excluded and debt comes from the active subscription."""
+        from decimal import Decimal
+        from app.models.payment import Payment, PaymentType, PaymentStatus
+        from app.models.subscription import Subscription, SubscriptionType
+        
+        db_session.add(Subscription(
+            student_id=test_student.id,
+            subscription_type=SubscriptionType.EIGHT_SESSIONS,
+            total_sessions=8,
+            remaining_sessions=8,
+            price=Decimal("4200.00"),
+            start_date=date(2025, 10, 1),
+            expiry_date=date(2025, 12, 1),
+            is_active=True
+        ))
+        await db_session.commit()
+        
+        url = f"/api/payments/unpaid-students?year=2025&month=10&group_id={test_group.id}"
+        response = await client.get(url, headers=auth_headers)
+        
+        assert response.status_code == 200
+        student = next(s for s in response.json()["students"] if s["student_id"] == str(test_student.id))
+        assert student["debt_amount"] == 4200.0
+        
+        db_session.add(Payment(
+            student_id=test_student.id,
+            amount=Decimal("4200.00"),
+            payment_date=date(2025, 10, 1),
+            payment_month=date(2025, 10, 1),
+            payment_type=PaymentType.FULL,
+            status=PaymentStatus.PAID
+        ))
+        await db_session.commit()
+        
+        response = await client.get(url, headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert all(s["student_id"] != str(test_student.id) for s in response.json()["students"])
+    
+    @pytest.mark.asyncio
+    async def test_get_unpaid_students_paginated(self, client: AsyncClient, auth_headers: dict, test_student):
+        """Test that total_unpaid counts all pages when limit is given."""
+        full = await client.get("/api/payments/unpaid-students?year=2025&month=10", headers=auth_headers)
+        page = await client.get("/api/payments/unpaid-students?year=2025&month=10&limit=1", headers=auth_headers)
+        
+        assert page.status_code == 200
+        data = page.json()
+        assert len(data["students"]) <= 1
+        assert data["total_unpaid"] == full.json()["total_unpaid"]
+    
     @pytest.mark.asyncio
     async def test_get_unpaid_students_unauthorized(self, client: AsyncClient):
         """Test unpaid students without authentication."""
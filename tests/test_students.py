@@ -103,6 +103,42 @@ class TestStudentRetrieval:
         assert isinstance(result, list)
         assert len(result) > 0
     
+    @pytest.mark.asyncio
+    async def test_get_students_includes_group_and_subscription(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test that the list carries group name and active subscription type."""
+        from decimal import Decimal
+        from app.models.subscription import Subscription, SubscriptionType
+        
+        for start_date, subscription_type, is_active in [
+            (date(2025, 11, 1), SubscriptionType.EIGHT_SESSIONS, False),
+            (date(2025, 10, 1), SubscriptionType.TWELVE_SESSIONS, True),
+        ]:
+            db_session.add(Subscription(
+                student_id=test_student.id,
+                subscription_type=subscription_type,
+                total_sessions=8,
+                remaining_sessions=8,
+                price=Decimal("4200.00"),
+                start_date=start_date,
+                expiry_date=date(2025, 12, 1),
+                is_active=is_active
+            ))
+        await db_session.commit()
+        
+        response = await client.get("/api/students", headers=auth_headers)
+        
+        assert response.status_code == 200
+        student = next(s for s in response.json() if s["id"] == str(test_student.id))
+        assert student["group_name"] == test_group.name
+        assert student["subscription_type"] == SubscriptionType.TWELVE_SESSIONS.value
+    
     @pytest.mark.asyncio
     async def test_get_students_by_group(
         self, 
@@ -160,6 +196,119 @@ class TestStudentRetrieval:
         for student in result:
             assert student["is_active"] == True
     
+    @pytest.mark.asyncio
+    async def test_get_students_paginated(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student,
+        db_session
+    ):
+        """Test walking the student list page by page with the cursor header."""
+        from app.models.student import Student
+        
+        for name in ["Андреев Андрей", "Борисов Борис"]:
+            db_session.add(Student(
+                full_name=name,
+                birth_date=date(2012, 1, 1),
+                phone="+79990000000",
+                group_id=test_student.group_id,
+                trainer_id=test_student.trainer_id
+            ))
+        await db_session.commit()
+        
+        full = await client.get("/api/students", headers=auth_headers)
+        expected = [s["id"] for s in full.json()]
+        
+        collected = []
+        url = "/api/students?limit=1"
+        while True:
+            response = await client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 1
+            collected.extend(s["id"] for s in page)
+            
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            url = f"/api/students?limit=1&cursor={next_cursor}"
+        
+        assert collected == expected
+    
+    @pytest.mark.asyncio
+    async def test_get_students_sparse_fields(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student
+    ):
+        """Test that fields= returns only the requested attributes."""
+        response = await client.get("/api/students?fields=id,full_name", headers=auth_headers)
+        
+        assert response.status_code == 200
+        result = response.json()
+        assert len(result) > 0
+        assert all(set(s) == {"id", "full_name"} for s in result)
+        
+        response = await client.get("/api/students?fields=id,password", headers=auth_headers)
+        assert response.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_sparse_fields_match_full_response(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student,
+        db_session
+    ):
+        """Test that a field serializes the same with and without fields=."""
+        test_student.additional_group_ids = None
+        await db_session.commit()
+        
+        full = await client.get("/api/students", headers=auth_headers)
+        sparse = await client.get("/api/students?fields=id,additional_group_ids,birth_date", headers=auth_headers)
+        
+        assert full.status_code == 200
+        assert sparse.status_code == 200
+        full_by_id = {s["id"]: s for s in full.json()}
+        for student in sparse.json():
+            assert student["additional_group_ids"] == full_by_id[student["id"]]["additional_group_ids"] == []
+            assert student["birth_date"] == full_by_id[student["id"]]["birth_date"]
+    
+    @pytest.mark.asyncio
+    async def test_search_students(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student
+    ):
+        """Test searching students by part of the name and phone."""
+        name_part = test_student.full_name.split()[0][:4]
+        response = await client.get(
+            f"/api/students/search?q={name_part}",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        result = response.json()
+        assert any(s["id"] == str(test_student.id) for s in result)
+        
+        response = await client.get(
+            f"/api/students/search?q={test_student.phone[-4:]}&limit=1",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        assert len(response.json()) <= 1
+    
+    @pytest.mark.asyncio
+    async def test_search_students_requires_query(self, client: AsyncClient, auth_headers: dict):
+        """Test that empty search query is rejected."""
+        response = await client.get("/api/students/search?q=", headers=auth_headers)
+        
+        assert response.status_code == 422
+    
     @pytest.mark.asyncio
     async def test_get_student_by_id(
         self, 
@@ -178,6 +327,110 @@ class TestStudentRetrieval:
         assert result["id"] == str(test_student.id)
         assert result["full_name"] == test_student.full_name
 
+    
+    @pytest.mark.asyncio
+    async def test_get_student_profile(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student,
+        test_group
+    ):
+        """Test that the profile returns the student with all sections."""
+        await client.post(
+            "/api/attendance/mark",
+            json={
+                "group_id": str(test_group.id),
+                "session_date": "2025-10-06",
+                "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+            },
+            headers=auth_headers
+        )
+        
+        response = await client.get(f"/api/students/{test_student.id}/profile", headers=auth_headers)
+        
+        assert response.status_code == 200
+        result = response.json()
+        assert result["student"]["id"] == str(test_student.id)
+        assert result["student"]["group_name"] == test_group.name
+        assert result["statistics"]["total_attendances"] >= 1
+        assert any(a["session_date"] == "2025-10-06" for a in result["attendance"])
+        assert isinstance(result["subscriptions"], list)
+        assert isinstance(result["payments"], list)
+        assert result["tournaments"]["student_id"] == str(test_student.id)
+    
+    @pytest.mark.asyncio
+    async def test_get_student_profile_include(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student
+    ):
+        """Test that include= limits the returned sections."""
+        response = await client.get(
+            f"/api/students/{test_student.id}/profile?include=payments&limit=5",
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        result = response.json()
+        assert isinstance(result["payments"], list)
+        assert result["attendance"] is None
+        assert result["tournaments"] is None
+        
+        response = await client.get(
+            f"/api/students/{test_student.id}/profile?include=passwords",
+            headers=auth_headers
+        )
+        assert response.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_get_student_profile_without_free_sessions(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student
+    ):
+        """Test that sections load on the request session when no extra sessions are free."""
+        from app.api.students import _profile_sessions
+        from app.constants import MAX_PROFILE_EXTRA_SESSIONS
+        
+        for _ in range(MAX_PROFILE_EXTRA_SESSIONS):
+            await _profile_sessions.acquire()
+        try:
+            response = await client.get(f"/api/students/{test_student.id}/profile", headers=auth_headers)
+        finally:
+            for _ in range(MAX_PROFILE_EXTRA_SESSIONS):
+                _profile_sessions.release()
+        
+        assert response.status_code == 200
+        result = response.json()
+        assert result["statistics"] is not None
+        assert isinstance(result["payments"], list)
+        assert isinstance(result["attendance"], list)
+    
+    @pytest.mark.asyncio
+    async def test_get_student_statistics_expected_sessions(
+        self,
+        client: AsyncClient,
+        auth_headers: dict,
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test expected sessions count the group trainings since registration."""
+        from datetime import timedelta
+        from app.utils.training_calendar import count_session_dates
+        
+        test_student.registration_date = date.today() - timedelta(days=60)
+        await db_session.commit()
+        
+        response = await client.get(f"/api/students/{test_student.id}/statistics", headers=auth_headers)
+        
+        assert response.status_code == 200
+        expected = count_session_dates(test_group, test_student.registration_date, date.today())
+        assert expected >= 20
+        assert response.json()["expected_sessions"] == expected
 
 class TestStudentUpdate:
     """Tests for updating students."""
@@ -312,3 +565,98 @@ class TestStudentDeletion:
         )
         deleted_student = result.scalar_one_or_none()
         assert deleted_student is None
+    
+    @pytest.mark.asyncio
+    async def test_delete_student_with_history(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test that deleting a student removes their attendance in the database."""
+        from app.models.attendance import Attendance
+        from sqlalchemy import select
+        
+        mark_response = await client.post(
+            "/api/attendance/mark",
+            json={
+                "group_id": str(test_group.id),
+                "session_date": "2025-10-06",
+                "attendances": [{"student_id": str(test_student.id), "status": "present"}]
+            },
+            headers=auth_headers
+        )
+        assert mark_response.status_code == 201
+        
+        response = await client.delete(f"/api/students/{test_student.id}", headers=auth_headers)
+        
+        assert response.status_code == 204
+        result = await db_session.execute(
+            select(Attendance).where(Attendance.student_id == test_student.id)
+        )
+        assert result.scalars().all() == []
+    
+    @pytest.mark.asyncio
+    async def test_archive_group_deactivates_students(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test that archiving a group keeps students but deactivates them."""
+        from app.models.student import Student
+        from sqlalchemy import select
+        
+        response = await client.post(f"/api/groups/{test_group.id}/archive", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.json()["is_active"] == False
+        
+        result = await db_session.execute(
+            select(Student)
+            .where(Student.id == test_student.id)
+            .execution_options(populate_existing=True)
+        )
+        student = result.scalar_one()
+        assert student.is_active == False
+    
+    @pytest.mark.asyncio
+    async def test_archive_group_deactivates_subscriptions(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict,
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test that archiving a group deactivates its students' active subscriptions."""
+        from decimal import Decimal
+        from sqlalchemy import select
+        from app.models.subscription import Subscription, SubscriptionType
+        
+        subscription = Subscription(
+            student_id=test_student.id,
+            subscription_type=SubscriptionType.EIGHT_SESSIONS,
+            total_sessions=8,
+            remaining_sessions=8,
+            price=Decimal("4200.00"),
+            start_date=date(2025, 10, 1),
+            expiry_date=date(2025, 12, 1),
+            is_active=True
+        )
+        db_session.add(subscription)
+        await db_session.commit()
+        
+        for _ in range(2):
+            # Повторный архив ничего не ломает
+            response = await client.post(f"/api/groups/{test_group.id}/archive", headers=auth_headers)
+            assert response.status_code == 200
+        
+        is_active = await db_session.scalar(
+            select(Subscription.is_active).where(Subscription.id == subscription.id)
+        )
+        assert is_active == False
@@ -133,6 +133,48 @@ class TestSubscriptionRetrieval:
         # Check that active subscription is first
         assert result[0]["is_active"] == True
 
+    
+    @pytest.mark.asyncio
+    async def test_get_subscriptions_usage_bulk(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test bulk usage by ids and by group."""
+        from app.models.subscription import Subscription, SubscriptionType
+        
+        subscription = Subscription(
+            student_id=test_student.id,
+            subscription_type=SubscriptionType.EIGHT_SESSIONS,
+            total_sessions=8,
+            remaining_sessions=6,
+            price=Decimal("4200.00"),
+            start_date=date(2025, 10, 1),
+            expiry_date=date(2025, 12, 1),
+            is_active=True
+        )
+        db_session.add(subscription)
+        await db_session.commit()
+        
+        for url in [
+            f"/api/subscriptions/usage?ids={subscription.id}",
+            f"/api/subscriptions/usage?group_id={test_group.id}",
+        ]:
+            response = await client.get(url, headers=auth_headers)
+            
+            assert response.status_code == 200
+            usage = next(u for u in response.json() if u["subscription_id"] == str(subscription.id))
+            assert usage["student_id"] == str(test_student.id)
+            assert usage["used_sessions"] == 2
+            assert usage["usage_percentage"] == 25.0
+            # Пн/Ср/Пт с 2025-10-01 по 2025-12-01
+            assert usage["expected_sessions"] == 27
+        
+        response = await client.get("/api/subscriptions/usage", headers=auth_headers)
+        assert response.status_code == 400
 
 class TestSubscriptionUpdate:
     """Tests for updating subscriptions."""
@@ -306,3 +348,121 @@ class TestSubscriptionConstraints:
         
         # Should fail due to unique constraint
         assert response.status_code in [400, 409, 500]  # Depending on error handling
+    
+    @pytest.mark.asyncio
+    async def test_group_subscription_type_change_rotates_subscriptions(
+        self, 
+        client: AsyncClient, 
+        auth_headers: dict, 
+        test_student,
+        test_group,
+        db_session
+    ):
+        """Test that changing group's default subscription type replaces active subscriptions."""
+        from app.models.subscription import Subscription, SubscriptionType
+        from sqlalchemy import select
+        
+        db_session.add(Subscription(
+            student_id=test_student.id,
+            subscription_type=SubscriptionType.EIGHT_SESSIONS,
+            total_sessions=8,
+            remaining_sessions=3,
+            price=Decimal("4200.00"),
+            start_date=date(2025, 10, 1),
+            expiry_date=date(2025, 12, 1),
+            is_active=True
+        ))
+        await db_session.commit()
+        
+        response = await client.put(
+            f"/api/groups/{test_group.id}",
+            json={"default_subscription_type": "12_sessions"},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["default_subscription_type"] == "12_sessions"
+        
+        result = await db_session.execute(
+            select(Subscription).where(
+                Subscription.student_id == test_student.id,
+                Subscription.is_active == True
+            ).execution_options(populate_existing=True)
+        )
+        active = result.scalars().all()
+        assert len(active) == 1
+        assert active[0].subscription_type == SubscriptionType.TWELVE_SESSIONS
+        assert active[0].remaining_sessions == 12
+
+
+class TestSubscriptionSweeper:
+    """Tests for deactivation of stale subscriptions."""
+    
+    @pytest.mark.asyncio
+    async def test_deactivate_stale_subscriptions(self, test_student, test_user, test_group, db_session):
+        """Test that expired and used-up subscriptions are deactivated, valid ones kept."""
+        from app.models.student import Student
+        from app.models.subscription import Subscription, SubscriptionType
+        from app.core.subscription_sweeper import deactivate_stale_subscriptions
+        from sqlalchemy import select
+        
+        other_students = []
+        for name in ["Истекший Абонемент", "Израсходованный Абонемент"]:
+            student = Student(
+                full_name=name,
+                birth_date=date(2012, 1, 1),
+                phone="+79990000001",
+                group_id=test_group.id,
+                trainer_id=test_user.id
+            )
+            db_session.add(student)
+            other_students.append(student)
+        await db_session.commit()
+        
+        subscriptions = []
+        for student, remaining, expiry in [
+            (test_student, 5, date(2025, 12, 1)),
+            (other_students[0], 5, date(2025, 10, 31)),
+            (other_students[1], 0, date(2025, 12, 1)),
+        ]:
+            subscription = Subscription(
+                student_id=student.id,
+                subscription_type=SubscriptionType.EIGHT_SESSIONS,
+                total_sessions=8,
+                remaining_sessions=remaining,
+                price=Decimal("4200.00"),
+                start_date=date(2025, 10, 1),
+                expiry_date=expiry,
+                is_active=True
+            )
+            db_session.add(subscription)
+            subscriptions.append(subscription)
+        await db_session.commit()
+        
+        counts = await deactivate_stale_subscriptions(db_session, today=date(2025, 11, 15))
+        await db_session.commit()
+        
+        assert counts["expired"] >= 1
+        assert counts["exhausted"] >= 1
+        
+        result = await db_session.execute(
+            select(Subscription.id, Subscription.is_active)
+            .where(Subscription.id.in_([s.id for s in subscriptions]))
+        )
+        is_active = dict(result.all())
+        assert is_active[subscriptions[0].id] == True
+        assert is_active[subscriptions[1].id] == False
+        assert is_active[subscriptions[2].id] == False
+    
+    @pytest.mark.asyncio
+    async def test_sweeper_lock_is_held_by_one_connection(self, test_engine):
+        """Test that only one connection gets the sweeper lock until it is released."""
+        from app.core.subscription_sweeper import _try_lock, _release_lock
+        
+        async with test_engine.connect() as leader, test_engine.connect() as follower:
+            assert await _try_lock(leader) is True
+            assert await _try_lock(follower) is False
+            
+            await _release_lock(leader)
+            assert await _try_lock(follower) is True
+            await _release_lock(follower)